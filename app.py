@@ -1,6 +1,23 @@
 
+import os
 import streamlit as st
-import pandas as pd
+
+from datos import (
+    DIRECTORIO_CACHE_MPL,
+    cargar_datos_y_agregados,
+    cargar_por_bloques,
+    cargar_particiones,
+    leer_manifiesto,
+    rango_anios_manifiesto,
+    version_datos,
+)
+from cache_vistas import comprobar_version, cubo_ventas, indice_bitmap, ordenes_ventas
+from indices import filtrar_con_indice, mascara_filtros, valores_indice
+from perfil import PARAMETRO_PERFIL, ejecutar_con_perfil, perfilado_disponible, perfilado_solicitado
+
+# Usa la caché de fuentes de Matplotlib que deja calentada prebuild.py.
+# Debe fijarse antes de importar charts.py, que importa matplotlib.
+os.environ.setdefault("MPLCONFIGDIR", DIRECTORIO_CACHE_MPL)
 # Ya no necesitamos importar matplotlib.pyplot y seaborn aquí
 # porque están importados dentro de charts.py
 # import matplotlib.pyplot as plt
@@ -22,7 +39,9 @@ from charts import (
     tendencia_ventas_top_jp_plataformas, # Tendencia JP por plataforma
     tendencia_ventas_top_na_generos, # Tendencia NA por género
     tendencia_ventas_top_eu_generos, # Tendencia EU por género
-    tendencia_ventas_top_jp_generos # Tendencia JP por género
+    tendencia_ventas_top_jp_generos, # Tendencia JP por género
+    puntuaciones_vs_ventas, # Puntuaciones de crítica/usuarios frente a ventas
+    ranking_titulos # Ranking paginado de títulos más vendidos
 )
 
 # Configuración de la página de Streamlit
@@ -30,33 +49,69 @@ st.set_page_config(page_title="Dashboard de Videojuegos", layout="wide")
 st.title("🎮 Dashboard de Videojuegos")
 
 # Función para cargar y preprocesar los datos
-# @st.cache_data decora la función para cachear los datos, mejorando el rendimiento
-@st.cache_data
-def cargar_datos():
-    # Carga el archivo CSV
-    df = pd.read_csv("games.csv")
-    # Convierte los nombres de las columnas a minúsculas para facilitar el acceso
-    df.columns = [col.lower() for col in df.columns]
-    # Convierte 'year_of_release' a entero y maneja NaN.
-    # Es importante hacer esto antes de filtrar por años, ya que el deslizador espera enteros.
-    df['year_of_release'] = pd.to_numeric(df['year_of_release'], errors='coerce')
-    df = df.dropna(subset=['year_of_release']) # Elimina filas con NaN en year_of_release después de la conversión
-    df['year_of_release'] = df['year_of_release'].astype(int)
-
-    # Calcula las ventas totales sumando las ventas por región
-    df["total_sales"] = df[['na_sales', 'eu_sales', 'jp_sales', 'other_sales']].sum(axis=1)
-    return df
-
-# Carga los datos al iniciar la aplicación
-df = cargar_datos()
+# @st.cache_resource cachea los datos y los comparte entre ejecuciones sin copiarlos
+# (las vistas no los modifican). Si existe un snapshot vigente generado por prebuild.py
+# se carga de una sola lectura; si no, se lee y limpia games.csv como antes. La versión del dataset forma parte de la
+# clave, así un CSV nuevo se vuelve a cargar.
+@st.cache_resource(max_entries=1)
+def cargar_datos(version):
+    return cargar_datos_y_agregados()
+
+# Carga por particiones: sólo se leen los archivos Parquet que se solapan con el rango de años.
+# Se guarda sólo el DataFrame del último rango (no las particiones leídas), así la memoria
+# depende del rango elegido; al cambiarlo se vuelven a leer las particiones que se solapan.
+@st.cache_resource(max_entries=1)
+def cargar_rango_particionado(version, year_range):
+    return cargar_particiones(year_range)
+
+# Carga por bloques para datasets más grandes que la memoria (MODO_CARGA=bloques): el CSV se
+# pliega bloque a bloque en el cubo de ventas. Con CONSERVAR_FILAS=1 se guardan también las filas.
+@st.cache_resource(max_entries=1)
+def cargar_bloques(version, conservar_filas):
+    return cargar_por_bloques(conservar_filas=conservar_filas)
+
+MODO_BLOQUES = os.environ.get("MODO_CARGA", "").lower() == "bloques"
+CONSERVAR_FILAS = os.environ.get("CONSERVAR_FILAS", "").lower() in ("1", "true", "si", "sí")
+
+# Vistas que necesitan las filas de cada juego; sin filas se ocultan. Puntuaciones y ranking
+# siguen disponibles a partir de los bocetos de la carga por bloques (histograma y top de ventas).
+VISTAS_CON_FILAS = {
+    "Distribución de ventas por plataforma para comparación",
+    "Distribución de ventas por género en Top 10 Plataformas",
+    "Comparar ventas por videojuego y plataforma",
+}
+
+# Versión del dataset: forma parte de todas las claves de caché. Si cambia, los agregados
+# de las vistas cacheados con la versión anterior se invalidan de una vez.
+version = version_datos()
+comprobar_version(version)
+
+# Si existe un dataset particionado vigente (prebuild.py --particiones) se usa en lugar del
+# dataset completo; el rango de años del deslizador sale del manifiesto sin leer datos.
+manifiesto = None if MODO_BLOQUES else leer_manifiesto()
+# df contiene las filas de cada juego y cubo el cubo de ventas precalculado (año, plataforma,
+# género y clasificación). Las vistas que sólo suman ventas leen del cubo; el resto, de las filas.
+if MODO_BLOQUES:
+    carga = cargar_bloques(version, CONSERVAR_FILAS)
+    # Sin CONSERVAR_FILAS sólo se dispone del cubo
+    df, cubo = carga['filas'], carga['cubo_ventas']
+elif manifiesto is None:
+    # Carga los datos al iniciar la aplicación
+    df, agregados = cargar_datos(version)
+    cubo = agregados['cubo_ventas']
+else:
+    # Con particiones las filas y el cubo se cargan según el rango de años
+    df, cubo = None, None
 
 # --- Lógica principal de la aplicación con la barra lateral ---
 
 # Rango de años en la barra lateral
 # Asegúrate de que min_year y max_year existan y sean enteros antes de usarlos
-if not df.empty and 'year_of_release' in df.columns:
-    min_year = int(df['year_of_release'].min())
-    max_year = int(df['year_of_release'].max())
+if manifiesto is not None:
+    min_year, max_year = rango_anios_manifiesto(manifiesto)
+elif not cubo.empty and 'year_of_release' in cubo.columns:
+    min_year = int(cubo['year_of_release'].min())
+    max_year = int(cubo['year_of_release'].max())
 else:
     min_year = 1980 # Valor por defecto si no hay datos de año
     max_year = 2020 # Valor por defecto si no hay datos de año
@@ -71,36 +126,89 @@ year_range = st.sidebar.slider(
     value=(min_year, max_year) # Valor inicial del slider
 )
 
-# Filtra el DataFrame completo basado en el rango de años seleccionado
-df_filtered = df[(df['year_of_release'] >= year_range[0]) & (df['year_of_release'] <= year_range[1])]
-
-if df_filtered.empty:
-    st.warning("No hay datos para el rango de años seleccionado. Por favor, ajusta los filtros.")
+# DataFrame base sobre el que se aplican los filtros: el dataset completo o,
+# con particiones, sólo las filas del rango de años cargado. Lo mismo para el cubo.
+if manifiesto is not None:
+    df_base = cargar_rango_particionado(version, tuple(year_range))
+    clave_base = (version, tuple(year_range))
+    cubo_base = cubo_ventas(df_base, clave_base)
 else:
+    df_base = df
+    clave_base = (version, 'completo')
+    cubo_base = cubo
+# Indica si hay filas de juegos o sólo el cubo de ventas (modo por bloques sin filas)
+hay_filas = df_base is not None
+indice_cubo = indice_bitmap(cubo_base, clave_base + ('cubo',))
+indice = indice_bitmap(df_base, clave_base + ('filas',)) if hay_filas else None
+
+# Filtros cruzados por plataforma, género y clasificación ESRB (vacío = todos)
+st.sidebar.subheader("Filtros cruzados")
+plataformas_filtro = st.sidebar.multiselect("Plataformas", valores_indice(indice_cubo, 'platform'))
+generos_filtro = st.sidebar.multiselect("Géneros", valores_indice(indice_cubo, 'genre'))
+ratings_filtro = st.sidebar.multiselect("Clasificación ESRB", valores_indice(indice_cubo, 'rating'))
+
+# Filtra el cubo y las filas combinando los bitmaps del rango de años y de los filtros cruzados
+selecciones = {
+    'year_of_release': list(range(year_range[0], year_range[1] + 1)),
+    'platform': plataformas_filtro,
+    'genre': generos_filtro,
+    'rating': ratings_filtro,
+}
+mascara_cubo = mascara_filtros(indice_cubo, selecciones)
+cubo_filtrado = cubo_base if mascara_cubo is None else cubo_base[mascara_cubo]
+mascara = mascara_filtros(indice, selecciones) if hay_filas else None
+df_filtered = None if not hay_filas else (df_base if mascara is None else df_base[mascara])
+# Identifica el resultado del filtrado; con la versión del dataset forma la clave con la que
+# las vistas cachean sus agregados (ver cache_vistas.py)
+clave_filtro = (tuple(year_range), tuple(plataformas_filtro), tuple(generos_filtro), tuple(ratings_filtro))
+clave = (version, clave_filtro)
+
+# Selecciones propias de una vista (por ejemplo, las plataformas a comparar) sobre las filas o
+# sobre el cubo: se combinan con los filtros de la barra lateral mediante los bitmaps del índice,
+# sin comparar columnas de texto. Los valores de la vista sustituyen a los de la barra lateral
+# en su columna (siempre salen de los datos ya filtrados, así que son un subconjunto).
+def seleccionar_filas(**por_columna):
+    return filtrar_con_indice(df_base, indice, dict(selecciones, **por_columna))
+
+def seleccionar_cubo(**por_columna):
+    return filtrar_con_indice(cubo_base, indice_cubo, dict(selecciones, **por_columna))
+
+# Máscara de los filtros de la barra lateral sobre un boceto de la carga por bloques
+# (histograma de puntuaciones o filas del top de ventas), con su propio índice de bitmaps
+def mascara_boceto(boceto, nombre):
+    return mascara_filtros(indice_bitmap(boceto, clave_base + (nombre,)), selecciones)
+
+# Opciones de un selector de vistas, sin las que necesitan filas si sólo hay cubo de ventas
+def opciones_disponibles(opciones):
+    return opciones if hay_filas else [o for o in opciones if o not in VISTAS_CON_FILAS]
+
+# Despacho de la vista seleccionada: selectores de módulo y análisis, y llamada al gráfico.
+# Devuelve el módulo y la opción elegidos.
+def despachar_vista():
     # Selector de módulo en la barra lateral
     modulo = st.sidebar.radio("Selecciona módulo", ["Generales", "Ventas"])
 
     # Condicional para mostrar las opciones del módulo seleccionado
     if modulo == "Generales":
-        opcion = st.sidebar.selectbox("Análisis general", [
+        opcion = st.sidebar.selectbox("Análisis general", opciones_disponibles([
             "Duración de plataformas",
             "Plataformas activas por año",
             "Top plataformas por ventas",
             "Distribución de ventas por plataforma para comparación",
             "Distribución de ventas por género en Top 10 Plataformas" # Nueva opción
-        ])
+        ]))
         if opcion == "Duración de plataformas":
-            duracion_plataformas(df_filtered)
+            duracion_plataformas(cubo_filtrado, clave)
         elif opcion == "Plataformas activas por año":
-            plataformas_activas_por_anio(df_filtered)
+            plataformas_activas_por_anio(cubo_filtrado, clave)
         elif opcion == "Top plataformas por ventas":
-            top_plataformas(df_filtered)
+            top_plataformas(cubo_filtrado, clave)
         elif opcion == "Distribución de ventas por plataforma para comparación":
-            distribucion_ventas_por_plataforma(df_filtered)
+            distribucion_ventas_por_plataforma(df_filtered, clave, seleccionar_filas)
         elif opcion == "Distribución de ventas por género en Top 10 Plataformas": # Nueva llamada
-            distribucion_ventas_por_genero_top_plataformas(df_filtered)
+            distribucion_ventas_por_genero_top_plataformas(df_filtered, clave, seleccionar_filas)
     else: # Módulo de Ventas
-        opcion = st.sidebar.selectbox("Análisis de ventas", [
+        opcion = st.sidebar.selectbox("Análisis de ventas", opciones_disponibles([
             "Ventas por plataforma",
             "Comparador estadístico",
             "Comparar ventas por videojuego y plataforma",
@@ -110,25 +218,62 @@ else:
             "Tendencia de Ventas Top 5 JP Plataformas", # Nueva opción
             "Tendencia de Ventas Top 5 NA Géneros", # Nueva opción
             "Tendencia de Ventas Top 5 EU Géneros", # Nueva opción
-            "Tendencia de Ventas Top 5 JP Géneros" # Nueva opción
-        ])
+            "Tendencia de Ventas Top 5 JP Géneros", # Nueva opción
+            "Puntuaciones vs Ventas", # Nueva opción
+            "Ranking de títulos más vendidos" # Nueva opción
+        ]))
         if opcion == "Ventas por plataforma":
-            comparar_ventas_por_plataforma(df_filtered)
+            comparar_ventas_por_plataforma(cubo_filtrado, clave)
         elif opcion == "Comparador estadístico":
-            comparador_estadistico_ventas(df_filtered)
+            comparador_estadistico_ventas(cubo_filtrado, clave)
         elif opcion == "Comparar ventas por videojuego y plataforma":
-            comparar_ventas_por_juego_y_plataforma(df_filtered)
+            comparar_ventas_por_juego_y_plataforma(df_filtered, clave)
         elif opcion == "Análisis de Ventas Regionales y por Género": # Llamada a la nueva función unificada
-            analisis_ventas_por_region_y_genero(df_filtered)
+            analisis_ventas_por_region_y_genero(cubo_filtrado, clave, seleccionar_cubo)
         elif opcion == "Tendencia de Ventas Top 5 NA Plataformas": # Llamada
-            tendencia_ventas_top_na_plataformas(df_filtered)
+            tendencia_ventas_top_na_plataformas(cubo_filtrado, clave)
         elif opcion == "Tendencia de Ventas Top 5 EU Plataformas": # Llamada
-            tendencia_ventas_top_eu_plataformas(df_filtered)
+            tendencia_ventas_top_eu_plataformas(cubo_filtrado, clave)
         elif opcion == "Tendencia de Ventas Top 5 JP Plataformas": # Llamada
-            tendencia_ventas_top_jp_plataformas(df_filtered)
+            tendencia_ventas_top_jp_plataformas(cubo_filtrado, clave)
         elif opcion == "Tendencia de Ventas Top 5 NA Géneros": # Llamada
-            tendencia_ventas_top_na_generos(df_filtered)
+            tendencia_ventas_top_na_generos(cubo_filtrado, clave)
         elif opcion == "Tendencia de Ventas Top 5 EU Géneros": # Llamada
-            tendencia_ventas_top_eu_generos(df_filtered)
+            tendencia_ventas_top_eu_generos(cubo_filtrado, clave)
         elif opcion == "Tendencia de Ventas Top 5 JP Géneros": # Llamada
-            tendencia_ventas_top_jp_generos(df_filtered)
+            tendencia_ventas_top_jp_generos(cubo_filtrado, clave)
+        elif opcion == "Puntuaciones vs Ventas":
+            if hay_filas:
+                puntuaciones_vs_ventas(df_filtered, clave)
+            else:
+                histograma = carga['histograma_puntuaciones']
+                mascara_histograma = mascara_boceto(histograma, 'histograma')
+                if mascara_histograma is not None:
+                    histograma = histograma[mascara_histograma]
+                puntuaciones_vs_ventas(None, clave, histograma=histograma)
+        elif opcion == "Ranking de títulos más vendidos":
+            if hay_filas:
+                ranking_titulos(df_base, mascara, ordenes_ventas(df_base, clave_base))
+            else:
+                top = carga['top_ventas']
+                ranking_titulos(top['filas'], mascara_boceto(top['filas'], 'top'), top['ordenes'], top['cortes'])
+    return modulo, opcion
+
+
+# Con PERFIL_DASHBOARD=1 la barra lateral ofrece perfilar la vista actual: pulsar el botón
+# vuelve a ejecutar la app con la misma vista, rango y filtros, y esa ejecución se perfila
+perfilar_vista = perfilado_disponible() and st.sidebar.button("Perfilar esta vista")
+
+if cubo_filtrado.empty:
+    st.warning("No hay datos para el rango de años y los filtros seleccionados. Por favor, ajusta los filtros.")
+elif not perfilado_solicitado(st.query_params, perfilar_vista):
+    despachar_vista()
+else:
+    # Perfilado bajo demanda (?perfil=1 o el botón): se perfila esta ejecución del despacho
+    # y se retira el parámetro de la URL para que la siguiente ya no se perfile
+    (modulo, opcion), ruta_perfil, resumen_perfil = ejecutar_con_perfil(despachar_vista)
+    if PARAMETRO_PERFIL in st.query_params:
+        del st.query_params[PARAMETRO_PERFIL]
+    with st.expander(f"Perfil de esta ejecución ({modulo} / {opcion})"):
+        st.write(f"Rango de años: {year_range[0]}-{year_range[1]}. Perfil guardado en `{ruta_perfil}`")
+        st.code(resumen_perfil)
@@ -0,0 +1,186 @@
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# Mediciones de rendimiento del dashboard. Las de arranque se ejecutan en un proceso
+# nuevo para reproducir un arranque en frío real (sin cachés en memoria).
+#
+# Uso:
+#   python benchmarks.py arranque
+#   python benchmarks.py ranking
+#   python benchmarks.py memoria
+
+
+# Código que se ejecuta en el proceso hijo: arranca la app real con el arnés de pruebas de
+# Streamlit (importa app.py con charts.py y cache_vistas.py, carga los datos y hace el primer
+# despacho, que dibuja la vista por defecto) y mide el tiempo hasta terminar esa ejecución
+_SCRIPT_ARRANQUE = """
+import time
+inicio = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file("app.py", default_timeout=300).run()
+assert not app.exception, app.exception
+print(time.perf_counter() - inicio)
+"""
+
+# Archivos que no se copian al directorio del arranque sin prebuild
+_SIN_PREBUILD = ("games_snapshot.pkl*", ".cache", ".git", "games_particiones", "perfiles", "__pycache__")
+
+
+def _medir_proceso(directorio_app, directorio_mpl):
+    entorno = dict(os.environ, MPLCONFIGDIR=directorio_mpl)
+    salida = subprocess.run(
+        [sys.executable, "-c", _SCRIPT_ARRANQUE],
+        env=entorno, capture_output=True, text=True, check=True, cwd=directorio_app,
+    )
+    return float(salida.stdout.strip().splitlines()[-1])
+
+
+# Compara el arranque en frío de la app sin prebuild (copia del proyecto sin snapshot y con
+# la caché de Matplotlib vacía: lee y limpia games.csv) con el arranque tras el prebuild
+# (snapshot y caché de fuentes ya generados). Cada medición es un proceso nuevo.
+def medir_arranque_en_frio(repeticiones=3):
+    import shutil
+
+    from datos import RUTA_SNAPSHOT, calentar_matplotlib, construir_snapshot
+
+    directorio = os.path.dirname(os.path.abspath(__file__))
+    antes = []
+    with tempfile.TemporaryDirectory() as temporal:
+        copia = os.path.join(temporal, "app")
+        shutil.copytree(directorio, copia, ignore=shutil.ignore_patterns(*_SIN_PREBUILD))
+        for i in range(repeticiones):
+            directorio_vacio = os.path.join(temporal, f"mpl_{i}")
+            antes.append(_medir_proceso(copia, directorio_vacio))
+
+    if not os.path.exists(RUTA_SNAPSHOT):
+        construir_snapshot()
+    calentar_matplotlib()
+    despues = [_medir_proceso(directorio, os.environ["MPLCONFIGDIR"]) for _ in range(repeticiones)]
+
+    print(f"Arranque en frío sin prebuild:  {min(antes):.2f} s (mejor de {repeticiones})")
+    print(f"Arranque en frío con prebuild: {min(despues):.2f} s (mejor de {repeticiones})")
+    return min(antes), min(despues)
+
+
+# Mejor tiempo de varias ejecuciones de una función sin argumentos
+def _mejor_tiempo(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos)
+
+
+# Compara una página del ranking de títulos por el mismo camino que la app (índice y órdenes
+# obtenidos de sus accesores cacheados, máscara de filtros y página) frente al enfoque ingenuo
+# de filtrar y ordenar con sort_values en cada consulta.
+# El dataset se replica para acercarse al tamaño de un dataset grande.
+def medir_ranking(factor=60, pagina=5, tamano_pagina=25, repeticiones=5):
+    import numpy as np
+    import pandas as pd
+    from cache_vistas import indice_bitmap, ordenes_ventas
+    from datos import cargar_csv
+    from indices import mascara_filtros, pagina_ranking
+
+    df = pd.concat([cargar_csv()] * factor, ignore_index=True)
+    selecciones = {'year_of_release': list(range(2000, 2011)), 'genre': ['Action', 'Sports', 'Shooter']}
+    columna = 'na_sales'
+    clave_base = ('benchmark', 'completo')
+
+    # Primera llamada: construye y cachea las estructuras, como en la primera ejecución de la app
+    inicio = time.perf_counter()
+    indice_bitmap(df, clave_base)
+    ordenes_ventas(df, clave_base)
+    construccion = time.perf_counter() - inicio
+
+    def ingenuo():
+        filtrado = df[df['year_of_release'].between(2000, 2010) & df['genre'].isin(selecciones['genre'])]
+        return filtrado.sort_values(columna, ascending=False, kind='stable').iloc[
+            pagina * tamano_pagina:(pagina + 1) * tamano_pagina]
+
+    def preordenado():
+        mascara = mascara_filtros(indice_bitmap(df, clave_base), selecciones)
+        posiciones, _ = pagina_ranking(ordenes_ventas(df, clave_base)[columna], mascara, pagina, tamano_pagina)
+        return df.iloc[posiciones]
+
+    # Ambos enfoques deben devolver exactamente las mismas filas
+    assert np.array_equal(ingenuo().index.to_numpy(), preordenado().index.to_numpy())
+
+    t_ingenuo = _mejor_tiempo(ingenuo, repeticiones)
+    t_preordenado = _mejor_tiempo(preordenado, repeticiones)
+    print(f"Ranking sobre {len(df)} filas, página {pagina + 1} de {tamano_pagina} títulos")
+    print(f"Construcción de índices (una vez):      {construccion * 1000:.1f} ms")
+    print(f"Filtro + sort_values por consulta:      {t_ingenuo * 1000:.1f} ms")
+    print(f"Caché + máscara + página por consulta:  {t_preordenado * 1000:.1f} ms")
+    return t_ingenuo, t_preordenado
+
+
+# Memoria máxima (tracemalloc) de una función sin argumentos, en MB
+def _pico_memoria(funcion):
+    import gc
+    import tracemalloc
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        funcion()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return pico / 1e6
+
+
+# Compara la memoria máxima de la carga completa con la de la carga por bloques sobre
+# CSV cada vez más grandes (games.csv replicado). Con la carga por bloques el pico debe
+# mantenerse acotado aunque crezca el archivo; además se comprueba que el cubo es idéntico.
+def medir_memoria_bloques(factores=(10, 40), tamano_bloque=50_000):
+    import pandas as pd
+    from datos import (
+        DIMENSIONES_CUBO,
+        RUTA_CSV,
+        calcular_cubo,
+        cargar_csv,
+        cargar_por_bloques,
+    )
+
+    original = pd.read_csv(RUTA_CSV)
+    picos_bloques = []
+    with tempfile.TemporaryDirectory() as directorio:
+        for factor in factores:
+            ruta = os.path.join(directorio, f"games_x{factor}.csv")
+            pd.concat([original] * factor, ignore_index=True).to_csv(ruta, index=False)
+            tamano_mb = os.path.getsize(ruta) / 1e6
+
+            pico_completo = _pico_memoria(lambda: calcular_cubo(cargar_csv(ruta)))
+            pico_bloques = _pico_memoria(lambda: cargar_por_bloques(ruta, tamano_bloque))
+            picos_bloques.append(pico_bloques)
+
+            completo = calcular_cubo(cargar_csv(ruta)).sort_values(DIMENSIONES_CUBO, ignore_index=True)
+            por_bloques = cargar_por_bloques(ruta, tamano_bloque)['cubo_ventas'].sort_values(
+                DIMENSIONES_CUBO, ignore_index=True)
+            pd.testing.assert_frame_equal(completo, por_bloques, check_exact=False)
+
+            print(f"CSV de {tamano_mb:.0f} MB (x{factor}): carga completa {pico_completo:.0f} MB, "
+                  f"por bloques {pico_bloques:.0f} MB")
+
+    # El pico por bloques no debe crecer con el tamaño del archivo (margen del 50 %)
+    assert max(picos_bloques) < 1.5 * min(picos_bloques), "La memoria de la carga por bloques no está acotada"
+    return picos_bloques
+
+
+MEDICIONES = {
+    "arranque": medir_arranque_en_frio,
+    "ranking": medir_ranking,
+    "memoria": medir_memoria_bloques,
+}
+
+
+if __name__ == "__main__":
+    nombres = sys.argv[1:] or list(MEDICIONES)
+    for nombre in nombres:
+        MEDICIONES[nombre]()
@@ -0,0 +1,233 @@
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from datos import BORDES_PUNTUACION, BORDES_VENTAS, COLUMNAS_VENTAS, calcular_cubo, celdas_puntuacion_ventas
+from indices import construir_indice_bitmap, construir_ordenes_ventas
+from metricas import metricas_por_entidad
+
+# Este archivo contiene la capa de memoización de las vistas. Cada vista separa su
+# agregación (una función pura de este módulo) del dibujado, y el resultado se cachea
+# por separado con la clave (versión del dataset, filtros, parámetros de la vista):
+#   - el DataFrame filtrado no se hashea (_df); lo identifica la clave, que es la tupla
+#     (versión del dataset, clave de filtro) que app.py pasa a las vistas,
+#   - cada función guarda como máximo MAX_ENTRADAS resultados (los más antiguos se descartan),
+#   - cambiar la versión del dataset deja obsoletas todas las entradas a la vez y
+#     comprobar_version() las borra para liberar la memoria.
+
+MAX_ENTRADAS = 32
+
+# Funciones cacheadas registradas, para poder invalidarlas todas juntas
+_AGREGADOS = []
+_version_actual = None
+
+
+# Decorador de las agregaciones de vista: cache acotada y registro para la invalidación
+def agregado_de_vista(funcion):
+    cacheada = st.cache_data(max_entries=MAX_ENTRADAS, show_spinner=False)(funcion)
+    _AGREGADOS.append(cacheada)
+    return cacheada
+
+
+# Borra todos los agregados y estructuras derivadas cacheados
+def invalidar_agregados():
+    for funcion in _AGREGADOS:
+        funcion.clear()
+
+
+# Si la versión del dataset ha cambiado desde la última ejecución, invalida todos los agregados
+def comprobar_version(version):
+    global _version_actual
+    if _version_actual is not None and version != _version_actual:
+        invalidar_agregados()
+    _version_actual = version
+
+
+# --- Estructuras derivadas de sólo lectura ---
+# El índice de bitmaps, los órdenes del ranking y el cubo de ventas se construyen una vez por
+# DataFrame base y se comparten entre ejecuciones con st.cache_resource, sin copiarlos ni
+# deserializarlos en cada ejecución. Por eso no deben modificarse. La clave identifica el
+# DataFrame base (versión del dataset y 'completo' o el rango cargado); _df no se hashea.
+
+# Decorador de las estructuras derivadas: cache compartida y registro para la invalidación
+def estructura_derivada(max_entries):
+    def decorador(funcion):
+        cacheada = st.cache_resource(max_entries=max_entries, show_spinner=False)(funcion)
+        _AGREGADOS.append(cacheada)
+        return cacheada
+    return decorador
+
+
+# Índice de bitmaps para los filtros cruzados: uno para las filas y otro para el cubo o, en la
+# carga por bloques sin filas, uno para el cubo y otro para cada boceto (histograma y top)
+@estructura_derivada(max_entries=3)
+def indice_bitmap(_df, clave):
+    return construir_indice_bitmap(_df)
+
+
+# Orden de filas de mayor a menor venta por región para el ranking de títulos
+@estructura_derivada(max_entries=1)
+def ordenes_ventas(_df, clave):
+    return construir_ordenes_ventas(_df, COLUMNAS_VENTAS)
+
+
+# Cubo de ventas de un DataFrame base (con snapshot o CSV ya viene precalculado)
+@estructura_derivada(max_entries=1)
+def cubo_ventas(_df, clave):
+    return calcular_cubo(_df)
+
+
+# Años de actividad (primer y último año de lanzamiento) de cada plataforma
+@agregado_de_vista
+def anios_actividad_plataformas(_df, clave):
+    return _df.groupby('platform')['year_of_release'].agg(['min', 'max'])
+
+
+# Número de plataformas distintas con lanzamientos en cada año
+@agregado_de_vista
+def plataformas_por_anio(_df, clave):
+    return _df.groupby('year_of_release')['platform'].nunique()
+
+
+# Ventas de cada plataforma en una columna de ventas, de mayor a menor
+@agregado_de_vista
+def ventas_por_plataforma(_df, clave, columna='total_sales'):
+    return _df.groupby('platform')[columna].sum().sort_values(ascending=False)
+
+
+# Ventas por región (filas) y plataforma (columnas) para todas las plataformas a la vez
+@agregado_de_vista
+def ventas_region_por_plataforma(_df, clave):
+    return _df.groupby('platform')[['na_sales', 'eu_sales', 'jp_sales', 'other_sales']].sum().T
+
+
+# Plataformas presentes en los datos, ordenadas alfabéticamente
+@agregado_de_vista
+def plataformas_disponibles(_df, clave):
+    return sorted(_df['platform'].dropna().unique())
+
+
+# Géneros presentes en los datos, ordenados alfabéticamente
+@agregado_de_vista
+def generos_disponibles(_df, clave):
+    return sorted(_df['genre'].dropna().unique().tolist())
+
+
+# Videojuegos publicados en más de una plataforma, ordenados alfabéticamente
+@agregado_de_vista
+def juegos_multiplataforma(_df, clave):
+    plataformas_por_juego = _df.groupby('name')['platform'].nunique()
+    return sorted(plataformas_por_juego[plataformas_por_juego > 1].index.tolist())
+
+
+# Ventas totales por plataforma de un videojuego
+@agregado_de_vista
+def ventas_juego_por_plataforma(_df, clave, nombre):
+    return _df[_df['name'] == nombre].groupby('platform')['total_sales'].sum().reset_index()
+
+
+# Ventas por género en una columna de ventas, de mayor a menor
+@agregado_de_vista
+def ventas_por_genero(_df, clave, columna):
+    return _df.groupby('genre')[columna].sum().sort_values(ascending=False)
+
+
+# Ventas por año y género de los géneros indicados en una columna de ventas. _seleccionar
+# devuelve los datos filtrados con el índice de bitmaps (ver seleccionar_cubo en app.py);
+# sólo se llama si el resultado no está en la caché.
+@agregado_de_vista
+def ventas_anio_genero(_seleccionar, clave, columna, generos):
+    datos = _seleccionar(genre=list(generos))
+    return datos.groupby(['year_of_release', 'genre'])[columna].sum().reset_index()
+
+
+# Métricas de tendencia de todas las plataformas o géneros en todas las regiones (ver metricas.py)
+@agregado_de_vista
+def metricas_tendencia(_df, clave, entidad):
+    return metricas_por_entidad(_df, entidad)
+
+
+# Correlación de Spearman por plataforma a partir de sumas agrupadas de los rangos:
+# Pearson sobre los rangos, con peso n (número de juegos de cada fila)
+def _spearman_por_plataforma(rangos, min_juegos):
+    rangos = rangos.assign(
+        nx=rangos['n'] * rangos['x'], ny=rangos['n'] * rangos['y'],
+        nxy=rangos['n'] * rangos['x'] * rangos['y'],
+        nxx=rangos['n'] * rangos['x'] ** 2, nyy=rangos['n'] * rangos['y'] ** 2,
+    )
+    sumas = rangos.groupby('platform').agg(
+        n=('n', 'sum'), sx=('nx', 'sum'), sy=('ny', 'sum'),
+        sxy=('nxy', 'sum'), sxx=('nxx', 'sum'), syy=('nyy', 'sum'),
+    )
+    covarianza = sumas['sxy'] - sumas['sx'] * sumas['sy'] / sumas['n']
+    varianza_x = sumas['sxx'] - sumas['sx'] ** 2 / sumas['n']
+    varianza_y = sumas['syy'] - sumas['sy'] ** 2 / sumas['n']
+    with np.errstate(invalid='ignore', divide='ignore'):
+        spearman = covarianza / np.sqrt(varianza_x * varianza_y)
+    correlaciones = pd.DataFrame({'juegos': sumas['n'], 'spearman': spearman})
+    correlaciones = correlaciones[correlaciones['juegos'] >= min_juegos].dropna()
+    return correlaciones.sort_values('spearman', ascending=False)
+
+
+# Puntuaciones frente a ventas: histograma 2D con las celdas fijas de datos.py y correlación
+# de Spearman exacta por plataforma
+@agregado_de_vista
+def puntuaciones_ventas(_df, clave, columna_puntuacion, min_juegos=10):
+    # 'tbd' y puntuaciones ausentes ya son NaN tras la limpieza; se descartan aquí
+    datos = _df[['platform', columna_puntuacion, 'total_sales']].dropna()
+    if datos.empty:
+        return None
+
+    celda_x, celda_y = celdas_puntuacion_ventas(
+        datos[columna_puntuacion].to_numpy(), datos['total_sales'].to_numpy(), columna_puntuacion)
+    conteos = np.zeros((len(BORDES_PUNTUACION[columna_puntuacion]) - 1, len(BORDES_VENTAS) - 1))
+    np.add.at(conteos, (celda_x, celda_y), 1)
+
+    # Spearman por plataforma en una sola pasada agrupada: rangos dentro de cada plataforma
+    grupos = datos.groupby('platform')
+    rangos = pd.DataFrame({
+        'platform': datos['platform'],
+        'n': 1,
+        'x': grupos[columna_puntuacion].rank(),
+        'y': grupos['total_sales'].rank(),
+    })
+
+    return {
+        'conteos': conteos,
+        'bordes_x': BORDES_PUNTUACION[columna_puntuacion],
+        'bordes_y': BORDES_VENTAS,
+        'n_juegos': len(datos),
+        'correlaciones': _spearman_por_plataforma(rangos, min_juegos),
+        'aproximada': False,
+    }
+
+
+# Lo mismo a partir del histograma plegado en la carga por bloques (ya filtrado), sin filas.
+# La correlación de Spearman se aproxima con los rangos medios de cada celda: los juegos de
+# una misma celda cuentan como empatados.
+@agregado_de_vista
+def puntuaciones_ventas_histograma(_histograma, clave, columna_puntuacion, min_juegos=10):
+    celdas = _histograma[_histograma['puntuacion'] == columna_puntuacion]
+    if celdas.empty:
+        return None
+
+    conteos = np.zeros((len(BORDES_PUNTUACION[columna_puntuacion]) - 1, len(BORDES_VENTAS) - 1))
+    np.add.at(conteos, (celdas['celda_x'].to_numpy(), celdas['celda_y'].to_numpy()), celdas['n_juegos'].to_numpy())
+
+    # Juegos por plataforma y celda; el rango medio de una celda en un eje es el número de
+    # juegos de la plataforma en celdas anteriores más (juegos de la celda + 1) / 2
+    celdas = celdas.groupby(['platform', 'celda_x', 'celda_y'])['n_juegos'].sum().rename('n').reset_index()
+    for eje in ('x', 'y'):
+        marginal = celdas.groupby(['platform', f'celda_{eje}'])['n'].sum().rename('m').reset_index()
+        marginal[eje] = marginal.groupby('platform')['m'].cumsum() - marginal['m'] + (marginal['m'] + 1) / 2
+        celdas = celdas.merge(marginal[['platform', f'celda_{eje}', eje]], on=['platform', f'celda_{eje}'])
+
+    return {
+        'conteos': conteos,
+        'bordes_x': BORDES_PUNTUACION[columna_puntuacion],
+        'bordes_y': BORDES_VENTAS,
+        'n_juegos': int(conteos.sum()),
+        'correlaciones': _spearman_por_plataforma(celdas, min_juegos),
+        'aproximada': True,
+    }
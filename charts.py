@@ -1,16 +1,24 @@
 
 import streamlit as st
-import pandas as pd
+import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.colors import LogNorm
+
+import cache_vistas
+from indices import pagina_ranking
+from metricas import resumen_ciclo_vida, top_entidades
 import seaborn as sns
 
 # Este archivo contiene todas las funciones para generar los diferentes gráficos.
+# Las agregaciones de cada vista se piden a cache_vistas con la clave de caché que recibe
+# cada función (versión del dataset y filtros), de modo que sólo se recalculan cuando
+# cambian los datos, los filtros o los parámetros de la propia vista.
 
-# Gráfico de duración de plataformas activas
-def duracion_plataformas(df_filtered):
+# Gráfico de duración de plataformas activas, con el resumen del ciclo de vida de cada plataforma
+def duracion_plataformas(df_filtered, clave):
     st.subheader("Duración de plataformas activas")
-    # Agrupa por plataforma y calcula el año mínimo y máximo de lanzamiento
-    duracion = df_filtered.groupby('platform')['year_of_release'].agg(['min', 'max'])
+    # Año mínimo y máximo de lanzamiento por plataforma
+    duracion = cache_vistas.anios_actividad_plataformas(df_filtered, clave).copy()
     # Calcula la duración restando el año mínimo del máximo
     duracion['duración'] = duracion['max'] - duracion['min']
     # Ordena y selecciona las 15 plataformas principales por duración
@@ -26,11 +34,17 @@ def duracion_plataformas(df_filtered):
     # Muestra el gráfico en Streamlit
     st.pyplot(fig)
 
+    st.write("### Ciclo de vida de las plataformas (ventas globales)")
+    metricas = cache_vistas.metricas_tendencia(df_filtered, clave, 'platform')
+    resumen = resumen_ciclo_vida(metricas, 'total_sales')
+    resumen = resumen[resumen.index.isin(duracion.index)]
+    st.dataframe(resumen.sort_values('ventas_pico', ascending=False))
+
 # Gráfico de plataformas activas por año
-def plataformas_activas_por_anio(df_filtered):
+def plataformas_activas_por_anio(df_filtered, clave):
     st.subheader("Plataformas activas por año")
     # Cuenta el número único de plataformas por año de lanzamiento
-    conteo = df_filtered.groupby('year_of_release')['platform'].nunique()
+    conteo = cache_vistas.plataformas_por_anio(df_filtered, clave)
 
     # Crea el gráfico de línea
     fig, ax = plt.subplots(figsize=(10, 6))
@@ -41,10 +55,10 @@ def plataformas_activas_por_anio(df_filtered):
     st.pyplot(fig)
 
 # Gráfico de top plataformas por ventas totales
-def top_plataformas(df_filtered):
+def top_plataformas(df_filtered, clave):
     st.subheader("Top plataformas por ventas totales")
-    # Agrupa por plataforma y suma las ventas totales, luego selecciona las 15 principales
-    ventas = df_filtered.groupby("platform")["total_sales"].sum().sort_values(ascending=False).head(15)
+    # Ventas totales por plataforma de mayor a menor; se seleccionan las 15 principales
+    ventas = cache_vistas.ventas_por_plataforma(df_filtered, clave).head(15)
 
     # Crea el gráfico de barras horizontales
     fig, ax = plt.subplots(figsize=(10, 6))
@@ -56,18 +70,14 @@ def top_plataformas(df_filtered):
     st.pyplot(fig)
 
 # Gráfico para comparar ventas por región de una plataforma seleccionada
-def comparar_ventas_por_plataforma(df_filtered):
+def comparar_ventas_por_plataforma(df_filtered, clave):
     st.subheader("Ventas por región según plataforma")
     # Obtiene todas las plataformas únicas y las ordena
-    plataformas = df_filtered['platform'].dropna().unique()
-    seleccion = st.selectbox("Elige una plataforma", sorted(plataformas))
+    plataformas = cache_vistas.plataformas_disponibles(df_filtered, clave)
+    seleccion = st.selectbox("Elige una plataforma", plataformas)
 
-    # Filtra los datos por la plataforma seleccionada
-    filtro = df_filtered[df_filtered['platform'] == seleccion]
-    # Columnas de ventas por región
-    columnas = ['na_sales', 'eu_sales', 'jp_sales', 'other_sales']
-    # Suma las ventas por región para la plataforma filtrada
-    ventas = filtro[columnas].sum()
+    # Ventas por región de la plataforma seleccionada (la tabla cubre todas las plataformas)
+    ventas = cache_vistas.ventas_region_por_plataforma(df_filtered, clave)[seleccion]
 
     # Crea el gráfico de barras
     fig, ax = plt.subplots(figsize=(8, 5))
@@ -77,10 +87,10 @@ def comparar_ventas_por_plataforma(df_filtered):
     st.pyplot(fig)
 
 # Gráfico para comparar ventas entre dos plataformas seleccionadas
-def comparador_estadistico_ventas(df_filtered):
+def comparador_estadistico_ventas(df_filtered, clave):
     st.subheader("Comparador de ventas entre plataformas")
     # Obtiene opciones para las dos plataformas a comparar
-    opciones = sorted(df_filtered['platform'].dropna().unique())
+    opciones = cache_vistas.plataformas_disponibles(df_filtered, clave)
     # Manejo de índices para evitar errores si hay menos de 2 plataformas
     p1_index = 0 if len(opciones) > 0 else None
     p2_index = 1 if len(opciones) > 1 else (0 if len(opciones) == 1 else None)
@@ -92,11 +102,8 @@ def comparador_estadistico_ventas(df_filtered):
         st.warning("Selecciona al menos dos plataformas para comparar.")
         return
 
-    columnas = ['na_sales', 'eu_sales', 'jp_sales', 'other_sales']
-    # Filtra los datos para ambas plataformas
-    datos = df_filtered[df_filtered['platform'].isin([p1, p2])]
-    # Agrupa por plataforma y suma las ventas por región, luego transpone el resultado
-    resumen = datos.groupby('platform')[columnas].sum().T
+    # Ventas por región (filas) de ambas plataformas (columnas)
+    resumen = cache_vistas.ventas_region_por_plataforma(df_filtered, clave)[sorted({p1, p2})]
 
     # Crea el gráfico de barras comparativo
     fig, ax = plt.subplots(figsize=(10, 5))
@@ -105,8 +112,9 @@ def comparador_estadistico_ventas(df_filtered):
     ax.set_ylabel("Millones de unidades")
     st.pyplot(fig)
 
-# Función para la distribución de ventas por plataforma (Histograma/Violin Plot/Box Plot) con selección múltiple
-def distribucion_ventas_por_plataforma(df_filtered):
+# Función para la distribución de ventas por plataforma (Histograma/Violin Plot/Box Plot) con selección múltiple.
+# seleccionar_filas(platform=[...]) devuelve las filas filtradas de esas plataformas usando el índice de bitmaps.
+def distribucion_ventas_por_plataforma(df_filtered, clave, seleccionar_filas):
     st.subheader("Distribución de Ventas por Plataforma para Comparación")
 
     # Dropdown para seleccionar el tipo de gráfico
@@ -117,7 +125,7 @@ def distribucion_ventas_por_plataforma(df_filtered):
     )
 
     # Obtiene las plataformas únicas y las ordena para el dropdown de selección múltiple
-    plataformas_disponibles = sorted(df_filtered['platform'].dropna().unique())
+    plataformas_disponibles = cache_vistas.plataformas_disponibles(df_filtered, clave)
     
     # Selecciona las plataformas por defecto para mostrar alguna comparación
     default_platforms = []
@@ -137,8 +145,8 @@ def distribucion_ventas_por_plataforma(df_filtered):
         st.warning("Por favor, selecciona al menos una plataforma para visualizar su distribución de ventas.")
         return
 
-    # Filtra los datos para las plataformas seleccionadas
-    df_plataforma_filtrada = df_filtered[df_filtered['platform'].isin(plataformas_seleccionadas)]
+    # Filtra los datos para las plataformas seleccionadas con los bitmaps del índice
+    df_plataforma_filtrada = seleccionar_filas(platform=plataformas_seleccionadas)
 
     # Verifica si hay datos para las plataformas seleccionadas en el rango de años
     if df_plataforma_filtrada.empty:
@@ -174,7 +182,7 @@ def distribucion_ventas_por_plataforma(df_filtered):
         
         # Iterar sobre las plataformas seleccionadas y trazar su histograma
         for platform in plataformas_seleccionadas:
-            data_to_plot = df_plataforma_filtrada[df_plataforma_filtrada['platform'] == platform]['total_sales']
+            data_to_plot = seleccionar_filas(platform=[platform])['total_sales']
             sns.histplot(data_to_plot, kde=True, ax=ax, label=platform, alpha=0.5, bins=30)
         ax.legend(title="Plataformas")
         ax.set_ylim(bottom=0)
@@ -183,15 +191,11 @@ def distribucion_ventas_por_plataforma(df_filtered):
 
 
 # Nueva función para comparar ventas de un mismo videojuego en diferentes plataformas
-def comparar_ventas_por_juego_y_plataforma(df_filtered):
+def comparar_ventas_por_juego_y_plataforma(df_filtered, clave):
     st.subheader("Comparación de Ventas por Videojuego y Plataforma")
 
-    # Obtener la lista de videojuegos únicos con al menos 2 plataformas disponibles en el df filtrado
-    # Agrupar por nombre de juego y contar las plataformas únicas
-    juegos_multiplataforma = df_filtered.groupby('name')['platform'].nunique()
-    # Filtrar solo los juegos que aparecen en más de una plataforma
-    juegos_con_comparacion = juegos_multiplataforma[juegos_multiplataforma > 1].index.tolist()
-    juegos_con_comparacion.sort() # Ordenar alfabéticamente
+    # Lista ordenada de videojuegos que aparecen en más de una plataforma en el df filtrado
+    juegos_con_comparacion = cache_vistas.juegos_multiplataforma(df_filtered, clave)
 
     if not juegos_con_comparacion:
         st.warning("No hay videojuegos con ventas en múltiples plataformas en el rango de años seleccionado para comparar.")
@@ -203,11 +207,8 @@ def comparar_ventas_por_juego_y_plataforma(df_filtered):
         juegos_con_comparacion
     )
 
-    # Filtrar el DataFrame para el juego seleccionado
-    df_juego_filtrado = df_filtered[df_filtered['name'] == juego_seleccionado]
-
-    # Agrupar las ventas totales por plataforma para el juego seleccionado
-    ventas_por_plataforma_juego = df_juego_filtrado.groupby('platform')['total_sales'].sum().reset_index()
+    # Ventas totales por plataforma para el juego seleccionado
+    ventas_por_plataforma_juego = cache_vistas.ventas_juego_por_plataforma(df_filtered, clave, juego_seleccionado)
     
     if ventas_por_plataforma_juego.empty:
         st.warning(f"No hay datos de ventas para '{juego_seleccionado}' en el rango de años actual.")
@@ -226,7 +227,7 @@ def comparar_ventas_por_juego_y_plataforma(df_filtered):
 
 # Función para la distribución de ventas por género en las Top 10 plataformas
 # Ahora con selección de tipo de gráfico (Boxplot, Violin Plot, Histograma)
-def distribucion_ventas_por_genero_top_plataformas(df_filtered):
+def distribucion_ventas_por_genero_top_plataformas(df_filtered, clave, seleccionar_filas):
     st.subheader("Distribución de Ventas por Género en Top 10 Plataformas")
 
     # Selector para el tipo de gráfico
@@ -237,10 +238,10 @@ def distribucion_ventas_por_genero_top_plataformas(df_filtered):
     )
 
     # Calcular las 10 plataformas con mayores ventas totales dentro del df_filtered actual
-    top_10_platforms_series = df_filtered.groupby('platform')['total_sales'].sum().nlargest(10).index
+    top_10_platforms_series = cache_vistas.ventas_por_plataforma(df_filtered, clave).head(10).index
     
-    # Filtrar el DataFrame para incluir solo las Top 10 plataformas
-    df_top_10 = df_filtered[df_filtered['platform'].isin(top_10_platforms_series)]
+    # Filtrar el DataFrame para incluir solo las Top 10 plataformas (con los bitmaps del índice)
+    df_top_10 = seleccionar_filas(platform=top_10_platforms_series.tolist())
 
     if df_top_10.empty:
         st.warning("No hay datos disponibles para las Top 10 plataformas en el rango de años seleccionado.")
@@ -286,8 +287,9 @@ def distribucion_ventas_por_genero_top_plataformas(df_filtered):
     st.pyplot(fig)
 
 
-# Nueva función unificada para el análisis de ventas por región y género
-def analisis_ventas_por_region_y_genero(df_filtered):
+# Nueva función unificada para el análisis de ventas por región y género.
+# seleccionar_cubo(genre=[...]) devuelve el cubo filtrado de esos géneros usando el índice de bitmaps.
+def analisis_ventas_por_region_y_genero(df_filtered, clave, seleccionar_cubo):
     st.subheader("Análisis de Ventas por Región y Género")
 
     # Selector de región de ventas
@@ -321,7 +323,7 @@ def analisis_ventas_por_region_y_genero(df_filtered):
         st.write(f"### Top Géneros por {selected_region_display}")
         
         # Agrupar por género y sumar las ventas de la región seleccionada
-        genre_sales = df_filtered.groupby('genre')[selected_region_column].sum().sort_values(ascending=False)
+        genre_sales = cache_vistas.ventas_por_genero(df_filtered, clave, selected_region_column)
 
         if genre_sales.empty:
             st.info(f"No hay datos de ventas para géneros en {selected_region_display} para el rango de años seleccionado.")
@@ -345,7 +347,7 @@ def analisis_ventas_por_region_y_genero(df_filtered):
         st.write(f"### Evolución de Ventas por Género en {selected_region_display}")
         
         # Seleccionar géneros para comparar (multiselect)
-        all_genres = sorted(df_filtered['genre'].dropna().unique().tolist())
+        all_genres = cache_vistas.generos_disponibles(df_filtered, clave)
         selected_genres_for_line = st.multiselect(
             "Selecciona géneros para comparar su evolución (máximo 5)",
             all_genres,
@@ -358,16 +360,14 @@ def analisis_ventas_por_region_y_genero(df_filtered):
             st.info("Por favor, selecciona al menos un género para el análisis de ventas acumuladas.")
             return
         
-        # Filtrar datos por los géneros seleccionados
-        df_filtered_genres = df_filtered[df_filtered['genre'].isin(selected_genres_for_line)]
-        
-        if df_filtered_genres.empty:
+        # Ventas de la región por año de lanzamiento y género, sólo de los géneros seleccionados
+        sales_over_time = cache_vistas.ventas_anio_genero(
+            seleccionar_cubo, clave, selected_region_column, sorted(selected_genres_for_line))
+
+        if sales_over_time.empty:
             st.warning("No hay datos para los géneros seleccionados en el rango de años actual.")
             return
 
-        # Agrupar por año de lanzamiento y género, sumando las ventas de la región
-        sales_over_time = df_filtered_genres.groupby(['year_of_release', 'genre'])[selected_region_column].sum().reset_index()
-
         fig, ax = plt.subplots(figsize=(14, 7))
         sns.lineplot(
             data=sales_over_time, 
@@ -386,347 +386,182 @@ def analisis_ventas_por_region_y_genero(df_filtered):
         st.pyplot(fig)
 
 
-# Función para la tendencia de ventas de las Top 5 Plataformas en Norteamérica
-def tendencia_ventas_top_na_plataformas(df_filtered):
-    st.subheader("Tendencia de Ventas de las Top 5 Plataformas en Norteamérica")
-
-    if df_filtered.empty:
-        st.warning("No hay datos disponibles para el rango de años seleccionado.")
-        return
-
-    # 1. Calcular las Top 5 plataformas por ventas totales en Norteamérica
-    na_sales_platform = df_filtered.groupby('platform')['na_sales'].sum().reset_index()
-    na_sales_platform = na_sales_platform.sort_values(by='na_sales', ascending=False).head(5)
-    
-    top_na_platforms_names = na_sales_platform['platform'].tolist()
-
-    if not top_na_platforms_names:
-        st.info("No se encontraron Top 5 plataformas con ventas en Norteamérica para el rango de años seleccionado.")
-        return
-
-    # 2. Filtrar el DataFrame para incluir solo los juegos de esas Top 5 plataformas
-    top_na_platforms_data = df_filtered[df_filtered['platform'].isin(top_na_platforms_names)]
-    sales_trend = top_na_platforms_data.groupby(['year_of_release', 'platform'])['na_sales'].sum().reset_index()
-
-    if sales_trend.empty:
-        st.info("No hay datos de tendencia para las Top 5 plataformas en Norteamérica en el rango de años seleccionado.")
-        return
-
-    # Crear el gráfico de línea
-    fig, ax = plt.subplots(figsize=(12, 7))
-
-    for platform in sales_trend['platform'].unique():
-        platform_data = sales_trend[sales_trend['platform'] == platform]
-        ax.plot(platform_data['year_of_release'], 
-                platform_data['na_sales'], label=platform, marker='o', linewidth=2)
-
-    ax.set_xlabel('Año', fontsize=12)
-    ax.set_ylabel('Ventas en Norteamérica (millones de USD)', fontsize=12)
-    ax.set_title('Tendencia de Ventas de las Top 5 Plataformas en Norteamérica', fontsize=16)
-    
-    # Rango fijo de años para este gráfico
-    ax.set_xlim(2000, 2016) 
-    
-    ax.legend(title='Plataforma', bbox_to_anchor=(1.05, 1), loc='upper left')
-    plt.grid(True, linestyle='--', alpha=0.7)
-    plt.tight_layout()
-    
-    st.pyplot(fig)
+# Métricas que se pueden mostrar en las vistas de tendencia (ver metricas.py)
+METRICAS_TENDENCIA = {
+    "Ventas anuales": ('ventas', 'Ventas en {region} (millones de USD)'),
+    "Media móvil (3 años)": ('media_movil', 'Media móvil de ventas en {region} (millones de USD)'),
+    "Crecimiento interanual (%)": ('crecimiento_yoy', 'Crecimiento interanual en {region} (%)'),
+    "Cuota acumulada de ventas": ('cuota_acumulada', 'Cuota acumulada de ventas en {region}'),
+}
 
 
-# Función para la tendencia de ventas de las Top 5 Plataformas en la Unión Europea
-def tendencia_ventas_top_eu_plataformas(df_filtered):
-    st.subheader("Tendencia de Ventas de las Top 5 Plataformas en la Unión Europea")
+# Gráfico común de tendencia de las Top 5 entidades (plataformas o géneros) en una región.
+# Las métricas se calculan (y cachean) para todas las entidades y regiones a la vez.
+def _tendencia_top5(df_filtered, clave, entidad, region, nombre_region, entidad_plural, etiqueta_entidad, xlim, key):
+    titulo = f"Tendencia de Ventas de {entidad_plural} en {nombre_region}"
+    st.subheader(titulo)
 
     if df_filtered.empty:
         st.warning("No hay datos disponibles para el rango de años seleccionado.")
         return
 
-    # 1. Calcular las Top 5 plataformas por ventas totales en la Unión Europea
-    eu_sales_platform = df_filtered.groupby('platform')['eu_sales'].sum().reset_index()
-    eu_sales_platform = eu_sales_platform.sort_values(by='eu_sales', ascending=False).head(5)
-    
-    top_eu_platforms_names = eu_sales_platform['platform'].tolist()
-
-    if not top_eu_platforms_names:
-        st.info("No se encontraron Top 5 plataformas con ventas en la Unión Europea para el rango de años seleccionado.")
+    # 1. Top 5 entidades por ventas totales en la región
+    metricas = cache_vistas.metricas_tendencia(df_filtered, clave, entidad)
+    top_nombres = top_entidades(metricas, region, 5)
+    if not top_nombres:
+        st.info(f"No se encontraron {entidad_plural} con ventas en {nombre_region} para el rango de años seleccionado.")
         return
 
-    # 2. Filtrar el DataFrame para incluir solo los juegos de esas Top 5 plataformas
-    top_eu_platforms_data = df_filtered[df_filtered['platform'].isin(top_eu_platforms_names)]
-    sales_trend = top_eu_platforms_data.groupby(['year_of_release', 'platform'])['eu_sales'].sum().reset_index()
+    metrica_display = st.radio("Métrica", list(METRICAS_TENDENCIA.keys()), horizontal=True, key=key)
+    metrica, etiqueta_y = METRICAS_TENDENCIA[metrica_display]
 
-    if sales_trend.empty:
-        st.info("No hay datos de tendencia para las Top 5 plataformas en la Unión Europea en el rango de años seleccionado.")
-        return
+    # 2. Columnas de las Top 5 en la región; fuera de su vida comercial la serie se deja vacía
+    serie = metricas[metrica][region][top_nombres]
+    activa = ~metricas['fase'][region][top_nombres].isin(['sin lanzar', 'retirada'])
+    serie = serie.where(activa)
 
     # Crear el gráfico de línea
     fig, ax = plt.subplots(figsize=(12, 7))
-
-    for platform in sales_trend['platform'].unique():
-        platform_data = sales_trend[sales_trend['platform'] == platform]
-        ax.plot(platform_data['year_of_release'], 
-                platform_data['eu_sales'], label=platform, marker='o', linewidth=2)
+    for nombre in top_nombres:
+        ax.plot(serie.index, serie[nombre], label=nombre, marker='o', linewidth=2)
 
     ax.set_xlabel('Año', fontsize=12)
-    ax.set_ylabel('Ventas en Europa (millones de USD)', fontsize=12)
-    ax.set_title('Tendencia de Ventas de las Top 5 Plataformas en la Unión Europea', fontsize=16)
-    
-    # Rango fijo de años para este gráfico
-    ax.set_xlim(2000, 2016) 
-    
-    ax.legend(title='Plataforma', bbox_to_anchor=(1.05, 1), loc='upper left')
-    plt.grid(True, linestyle='--', alpha=0.7)
-    plt.tight_layout()
-    
-    st.pyplot(fig)
-
-
-# Función para la tendencia de ventas de las Top 5 Plataformas en Japón
-def tendencia_ventas_top_jp_plataformas(df_filtered):
-    st.subheader("Tendencia de Ventas de las Top 5 Plataformas en Japón")
-
-    if df_filtered.empty:
-        st.warning("No hay datos disponibles para el rango de años seleccionado.")
-        return
-
-    # 1. Calcular las Top 5 plataformas por ventas totales en Japón
-    jp_sales_platform = df_filtered.groupby('platform')['jp_sales'].sum().reset_index()
-    jp_sales_platform = jp_sales_platform.sort_values(by='jp_sales', ascending=False).head(5)
-    
-    top_jp_platforms_names = jp_sales_platform['platform'].tolist()
-
-    if not top_jp_platforms_names:
-        st.info("No se encontraron Top 5 plataformas con ventas en Japón para el rango de años seleccionado.")
-        return
-
-    # 2. Filtrar el DataFrame para incluir solo los juegos de esas Top 5 plataformas
-    top_jp_platforms_data = df_filtered[df_filtered['platform'].isin(top_jp_platforms_names)]
-    sales_trend = top_jp_platforms_data.groupby(['year_of_release', 'platform'])['jp_sales'].sum().reset_index()
-
-    if sales_trend.empty:
-        st.info("No hay datos de tendencia para las Top 5 plataformas en Japón en el rango de años seleccionado.")
-        return
+    ax.set_ylabel(etiqueta_y.format(region=nombre_region), fontsize=12)
+    ax.set_title(f"{titulo} ({metrica_display})", fontsize=16)
 
-    # Crear el gráfico de línea
-    fig, ax = plt.subplots(figsize=(12, 7))
-
-    for platform in sales_trend['platform'].unique():
-        platform_data = sales_trend[sales_trend['platform'] == platform]
-        ax.plot(platform_data['year_of_release'], 
-                platform_data['jp_sales'], label=platform, marker='o', linewidth=2)
-
-    ax.set_xlabel('Año', fontsize=12)
-    ax.set_ylabel('Ventas en Japón (millones de USD)', fontsize=12)
-    ax.set_title('Tendencia de Ventas de las Top 5 Plataformas en Japón', fontsize=16)
-    
     # Rango fijo de años para este gráfico
-    ax.set_xlim(1995, 2016) 
-    
-    ax.legend(title='Plataforma', bbox_to_anchor=(1.05, 1), loc='upper left')
+    ax.set_xlim(*xlim)
+
+    ax.legend(title=etiqueta_entidad, bbox_to_anchor=(1.05, 1), loc='upper left')
     plt.grid(True, linestyle='--', alpha=0.7)
     plt.tight_layout()
-    
-    st.pyplot(fig)
-
-
-# Función para la tendencia de ventas de los Top 5 Géneros en Norteamérica
-def tendencia_ventas_top_na_generos(df_filtered):
-    st.subheader("Tendencia de Ventas de los Top 5 Géneros en Norteamérica")
-
-    # --- Mensajes de Depuración ---
-    st.write(f"DEBUG (NA Generos): df_filtered.empty al inicio: {df_filtered.empty}")
-    if not df_filtered.empty:
-        st.write(f"DEBUG (NA Generos): Columnas en df_filtered: {df_filtered.columns.tolist()}")
-        # st.write(f"DEBUG (NA Generos): Primeras filas de df_filtered (head):")
-        # st.write(df_filtered.head())
-    # --- Fin Mensajes de Depuración ---
-
-    if df_filtered.empty:
-        st.warning("No hay datos disponibles para el rango de años seleccionado.")
-        return
 
-    # 1. Calcular los Top 5 géneros por ventas totales en Norteamérica
-    na_main_genres = df_filtered.groupby('genre')['na_sales'].sum().reset_index()
-    na_main_genres = na_main_genres.sort_values(by='na_sales', ascending=False).head(5)
-    
-    top_na_genres_names = na_main_genres['genre'].tolist()
+    st.pyplot(fig)
 
-    # --- Mensajes de Depuración ---
-    st.write(f"DEBUG (NA Generos): Top 5 géneros NA calculados: {top_na_genres_names}")
-    # --- Fin Mensajes de Depuración ---
 
-    if not top_na_genres_names:
-        st.info("No se encontraron Top 5 géneros con ventas en Norteamérica para el rango de años seleccionado.")
-        return
+# Función para la tendencia de ventas de las Top 5 Plataformas en Norteamérica
+def tendencia_ventas_top_na_plataformas(df_filtered, clave):
+    _tendencia_top5(df_filtered, clave, 'platform', 'na_sales', "Norteamérica", "las Top 5 Plataformas",
+                    'Plataforma', (2000, 2016), key="na_platforms_metric")
 
-    # 2. Filtrar el DataFrame para incluir solo los juegos de esos Top 5 géneros
-    top_na_genres_data = df_filtered[df_filtered['genre'].isin(top_na_genres_names)]
-    sales_trend = top_na_genres_data.groupby(['year_of_release', 'genre'])['na_sales'].sum().reset_index()
 
-    # --- Mensajes de Depuración ---
-    st.write(f"DEBUG (NA Generos): sales_trend.empty después de agrupar: {sales_trend.empty}")
-    # if not sales_trend.empty:
-    #     st.write(f"DEBUG (NA Generos): sales_trend head():")
-    #     st.write(sales_trend.head())
-    # --- Fin Mensajes de Depuración ---
+# Función para la tendencia de ventas de las Top 5 Plataformas en la Unión Europea
+def tendencia_ventas_top_eu_plataformas(df_filtered, clave):
+    _tendencia_top5(df_filtered, clave, 'platform', 'eu_sales', "la Unión Europea", "las Top 5 Plataformas",
+                    'Plataforma', (2000, 2016), key="eu_platforms_metric")
 
-    if sales_trend.empty:
-        st.info("No hay datos de tendencia para los Top 5 géneros en Norteamérica en el rango de años seleccionado.")
-        return
 
-    # Crear el gráfico de línea
-    fig, ax = plt.subplots(figsize=(12, 7))
+# Función para la tendencia de ventas de las Top 5 Plataformas en Japón
+def tendencia_ventas_top_jp_plataformas(df_filtered, clave):
+    _tendencia_top5(df_filtered, clave, 'platform', 'jp_sales', "Japón", "las Top 5 Plataformas",
+                    'Plataforma', (1995, 2016), key="jp_platforms_metric")
 
-    for genre in sales_trend['genre'].unique():
-        genre_data = sales_trend[sales_trend['genre'] == genre]
-        ax.plot(genre_data['year_of_release'], 
-                genre_data['na_sales'], label=genre, marker='o', linewidth=2)
 
-    ax.set_xlabel('Año', fontsize=12)
-    ax.set_ylabel('Ventas en Norteamérica (millones de USD)', fontsize=12)
-    ax.set_title('Tendencia de Ventas de los Top 5 Géneros en Norteamérica', fontsize=16)
-    
-    # Rango fijo de años para este gráfico
-    ax.set_xlim(1985, 2016) 
-    
-    ax.legend(title='Género', bbox_to_anchor=(1.05, 1), loc='upper left')
-    plt.grid(True, linestyle='--', alpha=0.7)
-    plt.tight_layout()
-    
-    st.pyplot(fig)
+# Función para la tendencia de ventas de los Top 5 Géneros en Norteamérica
+def tendencia_ventas_top_na_generos(df_filtered, clave):
+    _tendencia_top5(df_filtered, clave, 'genre', 'na_sales', "Norteamérica", "los Top 5 Géneros",
+                    'Género', (1985, 2016), key="na_genres_metric")
 
 
 # Función para la tendencia de ventas de los Top 5 Géneros en Europa
-def tendencia_ventas_top_eu_generos(df_filtered):
-    st.subheader("Tendencia de Ventas de los Top 5 Géneros en Europa")
+def tendencia_ventas_top_eu_generos(df_filtered, clave):
+    _tendencia_top5(df_filtered, clave, 'genre', 'eu_sales', "Europa", "los Top 5 Géneros",
+                    'Género', (1995, 2016), key="eu_genres_metric")
 
-    # --- Mensajes de Depuración ---
-    st.write(f"DEBUG (EU Generos): df_filtered.empty al inicio: {df_filtered.empty}")
-    if not df_filtered.empty:
-        st.write(f"DEBUG (EU Generos): Columnas en df_filtered: {df_filtered.columns.tolist()}")
-        # st.write(f"DEBUG (EU Generos): Primeras filas de df_filtered (head):")
-        # st.write(df_filtered.head())
-    # --- Fin Mensajes de Depuración ---
 
-    if df_filtered.empty:
-        st.warning("No hay datos disponibles para el rango de años seleccionado.")
-        return
+# Función para la tendencia de ventas de los Top 5 Géneros en Japón
+def tendencia_ventas_top_jp_generos(df_filtered, clave):
+    _tendencia_top5(df_filtered, clave, 'genre', 'jp_sales', "Japón", "los Top 5 Géneros",
+                    'Género', (1982, 2016), key="jp_genres_metric")
 
-    # 1. Calcular los Top 5 géneros por ventas totales en Europa
-    eu_main_genres = df_filtered.groupby('genre')['eu_sales'].sum().reset_index()
-    eu_main_genres = eu_main_genres.sort_values(by='eu_sales', ascending=False).head(5)
-    
-    top_eu_genres_names = eu_main_genres['genre'].tolist()
 
-    # --- Mensajes de Depuración ---
-    st.write(f"DEBUG (EU Generos): Top 5 géneros EU calculados: {top_eu_genres_names}")
-    # --- Fin Mensajes de Depuración ---
+# Vista de puntuaciones de crítica/usuarios frente a ventas totales.
+# En lugar de un scatter con todas las filas se dibuja el histograma 2D ya agregado.
+# En la carga por bloques sin filas se pasa histograma (el boceto ya filtrado) y df_filtered es None.
+def puntuaciones_vs_ventas(df_filtered, clave, histograma=None):
+    st.subheader("Puntuaciones frente a Ventas Totales")
 
-    if not top_eu_genres_names:
-        st.info("No se encontraron Top 5 géneros con ventas en Europa para el rango de años seleccionado.")
+    opciones_puntuacion = {
+        "Puntuación de la crítica (0-100)": "critic_score",
+        "Puntuación de los usuarios (0-10)": "user_score",
+    }
+    seleccion = st.selectbox("Selecciona la puntuación", list(opciones_puntuacion.keys()), key="score_selector")
+    columna_puntuacion = opciones_puntuacion[seleccion]
+
+    if histograma is None:
+        resultado = cache_vistas.puntuaciones_ventas(df_filtered, clave, columna_puntuacion)
+    else:
+        resultado = cache_vistas.puntuaciones_ventas_histograma(histograma, clave, columna_puntuacion)
+    if resultado is None:
+        st.warning("No hay juegos con puntuación y ventas en el rango de años y los filtros seleccionados.")
         return
 
-    # 2. Filtrar el DataFrame para incluir solo los juegos de esos Top 5 géneros
-    top_eu_genres_data = df_filtered[df_filtered['genre'].isin(top_eu_genres_names)]
-    sales_trend = top_eu_genres_data.groupby(['year_of_release', 'genre'])['eu_sales'].sum().reset_index()
+    st.write(f"Juegos con puntuación: {resultado['n_juegos']}")
 
-    # --- Mensajes de Depuración ---
-    st.write(f"DEBUG (EU Generos): sales_trend.empty después de agrupar: {sales_trend.empty}")
-    # if not sales_trend.empty:
-    #     st.write(f"DEBUG (EU Generos): sales_trend head():")
-    #     st.write(sales_trend.head())
-    # --- Fin Mensajes de Depuración ---
-
-    if sales_trend.empty:
-        st.info("No hay datos de tendencia para los Top 5 géneros en Europa en el rango de años seleccionado.")
-        return
-
-    # Crear el gráfico de línea
     fig, ax = plt.subplots(figsize=(12, 7))
-
-    for genre in sales_trend['genre'].unique():
-        genre_data = sales_trend[sales_trend['genre'] == genre]
-        ax.plot(genre_data['year_of_release'], 
-                genre_data['eu_sales'], label=genre, marker='o', linewidth=2)
-
-    ax.set_xlabel('Año', fontsize=12)
-    ax.set_ylabel('Ventas en Europa (millones de USD)', fontsize=12)
-    ax.set_title('Tendencia de Ventas de los Top 5 Géneros en Europa', fontsize=16)
-    
-    # Rango fijo de años para este gráfico
-    ax.set_xlim(1995, 2016) 
-    
-    ax.legend(title='Género', bbox_to_anchor=(1.05, 1), loc='upper left')
-    plt.grid(True, linestyle='--', alpha=0.7)
+    # Las celdas vacías se enmascaran para que no se pinten
+    conteos = np.ma.masked_equal(resultado['conteos'].T, 0)
+    malla = ax.pcolormesh(resultado['bordes_x'], resultado['bordes_y'], conteos, cmap='viridis', norm=LogNorm())
+    fig.colorbar(malla, ax=ax, label='Número de juegos')
+    ax.set_yscale('log')
+    ax.set_title(f"{seleccion} frente a Ventas Totales", fontsize=16)
+    ax.set_xlabel(seleccion, fontsize=12)
+    ax.set_ylabel('Ventas Totales (millones, escala log)', fontsize=12)
     plt.tight_layout()
-    
     st.pyplot(fig)
 
+    st.write("### Correlación de Spearman por plataforma")
+    if resultado['aproximada']:
+        st.caption("Aproximada a partir de las celdas del histograma (carga por bloques sin filas).")
+    correlaciones = resultado['correlaciones']
+    if correlaciones.empty:
+        st.info("No hay plataformas con suficientes juegos puntuados para calcular la correlación.")
+    else:
+        st.dataframe(correlaciones.style.format({'spearman': '{:.3f}'}))
+
+
+# Ranking paginado de los títulos más vendidos en una región.
+# Usa el orden preordenado por región del DataFrame base y la máscara de filtros,
+# de modo que mostrar cualquier página nunca ordena el dataset completo.
+# En la carga por bloques sin filas df_base es la unión del top de cada región, cada orden
+# recorre sólo el top de su región y cortes indica, por región, la venta por debajo de la
+# cual pueden faltar títulos (None si no falta ninguno); el ranking termina ahí.
+def ranking_titulos(df_base, mascara, ordenes, cortes=None):
+    st.subheader("Ranking de Títulos Más Vendidos")
 
-# Función para la tendencia de ventas de los Top 5 Géneros en Japón
-def tendencia_ventas_top_jp_generos(df_filtered):
-    st.subheader("Tendencia de Ventas de los Top 5 Géneros en Japón")
-
-    # --- Mensajes de Depuración ---
-    st.write(f"DEBUG (JP Generos): df_filtered.empty al inicio: {df_filtered.empty}")
-    if not df_filtered.empty:
-        st.write(f"DEBUG (JP Generos): Columnas en df_filtered: {df_filtered.columns.tolist()}")
-        st.write(f"DEBUG (JP Generos): Primeras filas de df_filtered (head):")
-        st.write(df_filtered.head())
-    # --- Fin Mensajes de Depuración ---
-
-    if df_filtered.empty:
-        st.warning("No hay datos disponibles para el rango de años seleccionado.")
-        return
-
-    # 1. Calcular los Top 5 géneros por ventas totales en Japón
-    jp_main_genres = df_filtered.groupby('genre')['jp_sales'].sum().reset_index()
-    jp_main_genres = jp_main_genres.sort_values(by='jp_sales', ascending=False).head(5)
-    
-    top_jp_genres_names = jp_main_genres['genre'].tolist()
-
-    # --- Mensajes de Depuración ---
-    st.write(f"DEBUG (JP Generos): Top 5 géneros JP calculados: {top_jp_genres_names}")
-    # --- Fin Mensajes de Depuración ---
-
-    if not top_jp_genres_names:
-        st.info("No se encontraron Top 5 géneros con ventas en Japón para el rango de años seleccionado.")
-        return
-
-    # 2. Filtrar el DataFrame para incluir solo los juegos de esos Top 5 géneros
-    top_jp_genres_data = df_filtered[df_filtered['genre'].isin(top_jp_genres_names)]
-    sales_trend = top_jp_genres_data.groupby(['year_of_release', 'genre'])['jp_sales'].sum().reset_index()
-
-    # --- Mensajes de Depuración ---
-    st.write(f"DEBUG (JP Generos): sales_trend.empty después de agrupar: {sales_trend.empty}")
-    if not sales_trend.empty:
-        st.write(f"DEBUG (JP Generos): sales_trend head():")
-        st.write(sales_trend.head())
-    # --- Fin Mensajes de Depuración ---
-
-    if sales_trend.empty:
-        st.info("No hay datos de tendencia para los Top 5 géneros en Japón en el rango de años seleccionado.")
+    region_options = {
+        "Ventas Globales": "total_sales",
+        "Ventas Norteamérica (NA)": "na_sales",
+        "Ventas Europa (EU)": "eu_sales",
+        "Ventas Japón (JP)": "jp_sales",
+        "Otras Ventas": "other_sales"
+    }
+    selected_region_display = st.selectbox(
+        "Selecciona la región de ventas",
+        list(region_options.keys()),
+        key="ranking_region_selector"
+    )
+    selected_region_column = region_options[selected_region_display]
+    tamano_pagina = st.selectbox("Títulos por página", [10, 25, 50, 100], key="ranking_page_size")
+    corte = None if cortes is None else cortes[selected_region_column]
+    if corte is not None:
+        st.caption(f"Carga por bloques: el ranking llega hasta los títulos con más de {corte:.2f} millones "
+                   "de ventas en esta región; por debajo no se conservan todos los títulos.")
+
+    # El total de filas que cumplen los filtros se obtiene de la máscara, sin ordenar nada
+    _, total = pagina_ranking(ordenes[selected_region_column], mascara, 0, 0)
+    if total == 0:
+        st.warning("No hay títulos para el rango de años y los filtros seleccionados.")
         return
-
-    # Crear el gráfico de línea
-    fig, ax = plt.subplots(figsize=(12, 7))
-
-    for genre in sales_trend['genre'].unique():
-        genre_data = sales_trend[sales_trend['genre'] == genre]
-        # CORRECCIÓN: Cambiado 'platform_data' a 'genre_data'
-        ax.plot(genre_data['year_of_release'], 
-                genre_data['jp_sales'], label=genre, marker='o', linewidth=2)
-
-    ax.set_xlabel('Año', fontsize=12)
-    ax.set_ylabel('Ventas en Japón (millones de USD)', fontsize=12)
-    ax.set_title('Tendencia de Ventas de los Top 5 Géneros en Japón', fontsize=16)
-    
-    # Rango fijo de años para este gráfico
-    ax.set_xlim(1982, 2016) 
-    
-    ax.legend(title='Género', bbox_to_anchor=(1.05, 1), loc='upper left')
-    plt.grid(True, linestyle='--', alpha=0.7)
-    plt.tight_layout()
-    
-    st.pyplot(fig)
+    n_paginas = (total + tamano_pagina - 1) // tamano_pagina
+    pagina = st.number_input(f"Página (de {n_paginas})", min_value=1, max_value=n_paginas, value=1, key="ranking_page")
+
+    posiciones, _ = pagina_ranking(ordenes[selected_region_column], mascara, pagina - 1, tamano_pagina)
+    columnas = ['name', 'platform', 'year_of_release', 'genre', selected_region_column]
+    ranking = df_base.iloc[posiciones][columnas].reset_index(drop=True)
+    ranking.index = ranking.index + 1 + (pagina - 1) * tamano_pagina
+    ranking.index.name = 'puesto'
+    st.dataframe(ranking)
+    if corte is not None and pagina == n_paginas:
+        st.info(f"Fin del ranking disponible: los siguientes títulos venden {corte:.2f} millones o menos "
+                "y no se conservan en la carga por bloques.")
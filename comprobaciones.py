@@ -0,0 +1,105 @@
+
+import sys
+
+# Comprobaciones de corrección del dashboard (sin Streamlit). Se lanzan a mano o en CI
+# con este script, o desde el prebuild con --comprobaciones; no forman parte del build.
+#
+# Uso:
+#   python comprobaciones.py              # todas
+#   python comprobaciones.py ciclo_vida   # sólo las indicadas
+
+
+# Fases del ciclo de vida: una plataforma cuyo pico es el último año del rango no puede
+# estar en declive (en ese año su cuota acumulada es 1), y después del pico sí lo está
+def comprobar_ciclo_vida():
+    import pandas as pd
+    from metricas import metricas_por_entidad
+
+    anios = list(range(2000, 2009))
+    ventas = {
+        # Crece hasta el último año del rango
+        'Creciente': [1, 2, 3, 4, 5, 6, 7, 8, 20],
+        # Pico a mitad del rango y caída posterior
+        'Veterana': [5, 10, 20, 30, 20, 10, 5, 1, 1],
+    }
+    filas = [
+        {'year_of_release': anio, 'platform': plataforma, 'na_sales': valor, 'eu_sales': 0.0,
+         'jp_sales': 0.0, 'other_sales': 0.0, 'total_sales': valor}
+        for plataforma, valores in ventas.items() for anio, valor in zip(anios, valores)
+    ]
+    fase = metricas_por_entidad(pd.DataFrame(filas), 'platform')['fase']['total_sales']
+
+    assert fase.loc[2008, 'Creciente'] == 'madurez', fase['Creciente'].tolist()
+    assert 'declive' not in fase['Creciente'].tolist(), fase['Creciente'].tolist()
+    assert fase.loc[2003, 'Veterana'] == 'madurez', fase['Veterana'].tolist()
+    assert fase.loc[2008, 'Veterana'] == 'declive', fase['Veterana'].tolist()
+    print("Ciclo de vida: ok")
+
+
+# Bocetos de la carga por bloques: plegados en bloques pequeños deben coincidir con los
+# calculados sobre el dataset completo. El histograma debe ser idéntico y el ranking de cada
+# región, con y sin filtros, debe dar los mismos títulos en el mismo orden hasta su corte.
+def comprobar_bocetos_bloques(tamano_bloque=3_000, top_ranking=200):
+    import numpy as np
+    import pandas as pd
+    from datos import (
+        COLUMNAS_HISTOGRAMA,
+        COLUMNAS_VENTAS,
+        calcular_histograma_puntuaciones,
+        cargar_csv,
+        cargar_por_bloques,
+    )
+    from indices import construir_indice_bitmap, construir_ordenes_ventas, mascara_filtros, pagina_ranking
+
+    completo = cargar_csv()
+    carga = cargar_por_bloques(tamano_bloque=tamano_bloque, top_ranking=top_ranking)
+
+    esperado = calcular_histograma_puntuaciones(completo).sort_values(COLUMNAS_HISTOGRAMA, ignore_index=True)
+    obtenido = carga['histograma_puntuaciones'].sort_values(COLUMNAS_HISTOGRAMA, ignore_index=True)
+    pd.testing.assert_frame_equal(esperado, obtenido, check_dtype=False)
+
+    top = carga['top_ventas']
+    ordenes_completo = construir_ordenes_ventas(completo, COLUMNAS_VENTAS)
+    indice_completo = construir_indice_bitmap(completo)
+    indice_top = construir_indice_bitmap(top['filas'])
+    for selecciones in ({}, {'platform': ['GBA']}, {'genre': ['Puzzle'], 'year_of_release': list(range(2000, 2011))}):
+        mascara_completo = mascara_filtros(indice_completo, selecciones)
+        mascara_top = mascara_filtros(indice_top, selecciones)
+        for columna in COLUMNAS_VENTAS:
+            _, total = pagina_ranking(top['ordenes'][columna], mascara_top, 0, 0)
+            posiciones_top, _ = pagina_ranking(top['ordenes'][columna], mascara_top, 0, total)
+            posiciones, _ = pagina_ranking(ordenes_completo[columna], mascara_completo, 0, len(completo))
+            # En el dataset completo, sólo las filas por encima del corte de la región
+            corte = top['cortes'][columna]
+            if corte is not None:
+                posiciones = posiciones[completo[columna].to_numpy()[posiciones] > corte]
+            nombres_completo = completo['name'].to_numpy()[posiciones]
+            nombres_top = top['filas']['name'].to_numpy()[posiciones_top]
+            assert np.array_equal(nombres_completo, nombres_top), \
+                f"El ranking de {columna} con {selecciones} no coincide"
+    print("Bocetos de la carga por bloques: ok")
+
+
+# Memoria de la carga por bloques: el pico debe mantenerse acotado aunque crezca el CSV.
+# Versión reducida de `python benchmarks.py memoria`, con archivos y bloques más pequeños.
+def comprobar_memoria_bloques():
+    from benchmarks import medir_memoria_bloques
+
+    medir_memoria_bloques(factores=(2, 8), tamano_bloque=5_000)
+    print("Memoria de la carga por bloques: ok")
+
+
+COMPROBACIONES = {
+    "ciclo_vida": comprobar_ciclo_vida,
+    "bocetos": comprobar_bocetos_bloques,
+    "memoria": comprobar_memoria_bloques,
+}
+
+
+def ejecutar_comprobaciones(nombres=None):
+    for nombre in nombres or list(COMPROBACIONES):
+        COMPROBACIONES[nombre]()
+
+
+if __name__ == "__main__":
+    ejecutar_comprobaciones(sys.argv[1:])
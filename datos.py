@@ -0,0 +1,409 @@
+
+import json
+import os
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+
+# Este archivo contiene la carga, limpieza y precálculo de los datos del dashboard.
+# Se mantiene separado de app.py para poder usarlo desde el paso de prebuild
+# (prebuild.py) sin arrancar la interfaz de Streamlit.
+
+RUTA_CSV = "games.csv"
+RUTA_SNAPSHOT = "games_snapshot.pkl"
+# Directorio con el dataset particionado por año o década (ver escribir_particiones)
+RUTA_PARTICIONES = "games_particiones"
+ARCHIVO_MANIFIESTO = "manifest.json"
+# Directorio local para la caché de fuentes de Matplotlib, así el prebuild y la app comparten la misma
+DIRECTORIO_CACHE_MPL = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "matplotlib")
+
+# Se incrementa cada vez que cambia el contenido o el formato del snapshot
+VERSION_SNAPSHOT = 3
+
+COLUMNAS_REGION = ['na_sales', 'eu_sales', 'jp_sales', 'other_sales']
+COLUMNAS_VENTAS = COLUMNAS_REGION + ['total_sales']
+# Dimensiones por las que se agrega el cubo de ventas
+DIMENSIONES_CUBO = ['year_of_release', 'platform', 'genre', 'rating']
+
+
+# Limpieza común a todas las formas de carga (CSV completo, snapshot, prebuild)
+def limpiar_datos(df):
+    # Convierte los nombres de las columnas a minúsculas para facilitar el acceso
+    df.columns = [col.lower() for col in df.columns]
+    # Convierte 'year_of_release' a entero y maneja NaN.
+    # Es importante hacer esto antes de filtrar por años, ya que el deslizador espera enteros.
+    df['year_of_release'] = pd.to_numeric(df['year_of_release'], errors='coerce')
+    df = df.dropna(subset=['year_of_release']) # Elimina filas con NaN en year_of_release después de la conversión
+    df['year_of_release'] = df['year_of_release'].astype(int)
+
+    # Las puntuaciones pasan a numéricas; 'tbd' (pendiente de calificar) se trata como dato ausente
+    for columna in ['critic_score', 'user_score']:
+        if columna in df.columns:
+            df[columna] = pd.to_numeric(df[columna], errors='coerce')
+
+    # Calcula las ventas totales sumando las ventas por región
+    df["total_sales"] = df[COLUMNAS_REGION].sum(axis=1)
+    return df
+
+
+# Carga el CSV original y lo limpia
+def cargar_csv(ruta=RUTA_CSV):
+    return limpiar_datos(pd.read_csv(ruta))
+
+
+# Cubo de ventas: suma de ventas por año, plataforma, género y clasificación ESRB.
+# Es mucho más pequeño que el dataset y sirve para todas las vistas que sólo suman ventas.
+def calcular_cubo(df):
+    cubo = df.groupby(DIMENSIONES_CUBO, dropna=False)[COLUMNAS_VENTAS].sum()
+    cubo['n_juegos'] = df.groupby(DIMENSIONES_CUBO, dropna=False).size()
+    return cubo.reset_index()
+
+
+# Combina varios cubos parciales (por ejemplo, de distintos bloques del CSV) en uno solo
+def combinar_cubos(cubos):
+    combinado = pd.concat(cubos, ignore_index=True)
+    return combinado.groupby(DIMENSIONES_CUBO, dropna=False)[COLUMNAS_VENTAS + ['n_juegos']].sum().reset_index()
+
+
+# Agregados precalculados que se guardan en el snapshot. Las vistas que sólo suman ventas
+# (duración, plataformas activas, top, comparadores, géneros y tendencias) leen del cubo.
+def calcular_agregados(df):
+    return {
+        'cubo_ventas': calcular_cubo(df),
+    }
+
+
+# Identifica la versión del CSV de origen para saber si el snapshot está desactualizado
+def firma_origen(ruta=RUTA_CSV):
+    info = os.stat(ruta)
+    return (info.st_size, int(info.st_mtime))
+
+
+# Versión del dataset para las claves de caché de la app: cambia cuando cambia el CSV de
+# origen o el formato de los datos (VERSION_SNAPSHOT)
+def version_datos(ruta_csv=RUTA_CSV):
+    if not os.path.exists(ruta_csv):
+        return f"{VERSION_SNAPSHOT}:sin-csv"
+    tamano, modificado = firma_origen(ruta_csv)
+    return f"{VERSION_SNAPSHOT}:{tamano}:{modificado}"
+
+
+# Calienta la caché de fuentes de Matplotlib dibujando una figura de cada tipo que usa el
+# dashboard (barras, violín, caja, histograma con KDE, líneas y pcolormesh con escala
+# logarítmica) y guardándolas como PNG, como hace st.pyplot. Sólo persisten las cachés en
+# disco (fuentes); la primera ejecución de cada tipo de gráfico en el proceso de la app no se
+# puede calentar desde otro proceso.
+def calentar_matplotlib():
+    os.environ.setdefault("MPLCONFIGDIR", DIRECTORIO_CACHE_MPL)
+    import io
+
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    from matplotlib.colors import LogNorm
+
+    datos = pd.DataFrame({'grupo': ['a', 'a', 'b', 'b', 'b'], 'valor': [1.0, 2.0, 2.5, 3.0, 4.0]})
+    fig, ejes = plt.subplots(2, 3, figsize=(12, 7))
+    sns.barplot(x='grupo', y='valor', data=datos, hue='grupo', legend=False, ax=ejes[0, 0])
+    sns.violinplot(x='grupo', y='valor', data=datos, hue='grupo', legend=False, ax=ejes[0, 1])
+    sns.boxplot(x='grupo', y='valor', data=datos, hue='grupo', legend=False, ax=ejes[0, 2])
+    sns.histplot(datos['valor'], kde=True, bins=5, ax=ejes[1, 0], label='valor')
+    sns.lineplot(x=[0, 1, 2], y=[1, 3, 2], marker='o', ax=ejes[1, 1], label='calentamiento')
+    malla = ejes[1, 2].pcolormesh([0, 1, 2], [0.01, 0.1, 1], np.array([[1, 2], [3, 4]]), norm=LogNorm())
+    fig.colorbar(malla, ax=ejes[1, 2], label='Calentamiento')
+    ejes[1, 2].set_yscale('log')
+    for eje in ejes.flat:
+        eje.set_title("Calentamiento")
+    ejes[1, 0].legend()
+    plt.tight_layout()
+    fig.savefig(io.BytesIO(), format="png")
+    plt.close(fig)
+
+
+# Construye el snapshot con los datos limpios y los agregados, y lo escribe en disco
+def construir_snapshot(ruta_csv=RUTA_CSV, ruta_snapshot=RUTA_SNAPSHOT):
+    df = cargar_csv(ruta_csv)
+    snapshot = {
+        'version': VERSION_SNAPSHOT,
+        'origen': firma_origen(ruta_csv),
+        'creado': time.time(),
+        'datos': df,
+        'agregados': calcular_agregados(df),
+    }
+    # Se escribe primero en un archivo temporal para no dejar un snapshot a medias
+    ruta_temporal = ruta_snapshot + ".tmp"
+    with open(ruta_temporal, "wb") as f:
+        pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(ruta_temporal, ruta_snapshot)
+    return snapshot
+
+
+# Indica si el snapshot corresponde al CSV de origen actual (si el CSV no está, se da por bueno)
+def snapshot_vigente(snapshot, ruta_csv=RUTA_CSV):
+    if snapshot is None:
+        return False
+    return not os.path.exists(ruta_csv) or snapshot['origen'] == firma_origen(ruta_csv)
+
+
+# Lee el snapshot en una sola lectura; devuelve None si no existe o es de otra versión
+def leer_snapshot(ruta_snapshot=RUTA_SNAPSHOT):
+    if not os.path.exists(ruta_snapshot):
+        return None
+    try:
+        with open(ruta_snapshot, "rb") as f:
+            snapshot = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+    if not isinstance(snapshot, dict) or snapshot.get('version') != VERSION_SNAPSHOT:
+        return None
+    return snapshot
+
+
+# Carga los datos del dashboard: usa el snapshot si está vigente y, si no, el CSV.
+# Devuelve el DataFrame limpio y el diccionario de agregados.
+def cargar_datos_y_agregados(ruta_csv=RUTA_CSV, ruta_snapshot=RUTA_SNAPSHOT):
+    snapshot = leer_snapshot(ruta_snapshot)
+    if snapshot_vigente(snapshot, ruta_csv):
+        return snapshot['datos'], snapshot['agregados']
+    df = cargar_csv(ruta_csv)
+    return df, calcular_agregados(df)
+
+
+# --- Dataset particionado por año o década ---
+# Cada partición es un archivo Parquet y el manifiesto guarda, por partición, el número
+# de filas y los mínimos/máximos de año y ventas. Así la app puede leer sólo las
+# particiones que se solapan con el rango de años elegido.
+
+# Clave de partición de un año según la granularidad ('anio' o 'decada')
+def _clave_particion(anios, granularidad):
+    if granularidad == 'anio':
+        return anios
+    if granularidad == 'decada':
+        return anios // 10 * 10
+    raise ValueError(f"Granularidad de partición no válida: {granularidad!r} (usa 'anio' o 'decada')")
+
+
+# Escribe el dataset limpio como particiones Parquet más un manifiesto con estadísticas
+def escribir_particiones(df, directorio=RUTA_PARTICIONES, granularidad='anio', ruta_csv=RUTA_CSV):
+    os.makedirs(directorio, exist_ok=True)
+    # Elimina particiones anteriores para no mezclar granularidades distintas
+    for archivo in os.listdir(directorio):
+        if archivo.endswith(".parquet") or archivo == ARCHIVO_MANIFIESTO:
+            os.remove(os.path.join(directorio, archivo))
+
+    particiones = []
+    for clave, grupo in df.groupby(_clave_particion(df['year_of_release'], granularidad)):
+        archivo = f"{granularidad}={clave}.parquet"
+        grupo.to_parquet(os.path.join(directorio, archivo), index=False)
+        particiones.append({
+            'archivo': archivo,
+            'filas': int(len(grupo)),
+            'anio_min': int(grupo['year_of_release'].min()),
+            'anio_max': int(grupo['year_of_release'].max()),
+            'ventas_min': float(grupo['total_sales'].min()),
+            'ventas_max': float(grupo['total_sales'].max()),
+        })
+
+    manifiesto = {
+        'version': VERSION_SNAPSHOT,
+        'granularidad': granularidad,
+        'origen': list(firma_origen(ruta_csv)) if os.path.exists(ruta_csv) else None,
+        'particiones': particiones,
+    }
+    # El manifiesto se escribe al final: sin él, el directorio no se considera válido
+    with open(os.path.join(directorio, ARCHIVO_MANIFIESTO), "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, indent=2)
+    return manifiesto
+
+
+# Lee el manifiesto de particiones; devuelve None si no existe, es de otra versión
+# o corresponde a un CSV distinto del actual
+def leer_manifiesto(directorio=RUTA_PARTICIONES, ruta_csv=RUTA_CSV):
+    ruta = os.path.join(directorio, ARCHIVO_MANIFIESTO)
+    if not os.path.exists(ruta):
+        return None
+    with open(ruta, encoding="utf-8") as f:
+        manifiesto = json.load(f)
+    if manifiesto.get('version') != VERSION_SNAPSHOT:
+        return None
+    if manifiesto.get('origen') is not None and os.path.exists(ruta_csv) \
+            and tuple(manifiesto['origen']) != firma_origen(ruta_csv):
+        return None
+    return manifiesto
+
+
+# Rango total de años cubierto por el dataset particionado
+def rango_anios_manifiesto(manifiesto):
+    particiones = manifiesto['particiones']
+    return (min(p['anio_min'] for p in particiones), max(p['anio_max'] for p in particiones))
+
+
+# Particiones cuyo rango [anio_min, anio_max] se solapa con el rango pedido
+def particiones_en_rango(manifiesto, year_range):
+    desde, hasta = year_range
+    return [p for p in manifiesto['particiones'] if p['anio_max'] >= desde and p['anio_min'] <= hasta]
+
+
+# DataFrame vacío con las columnas y tipos del dataset particionado (se leen del esquema de una
+# partición, sin leer datos)
+def _particion_vacia(directorio, manifiesto):
+    import pyarrow.parquet as pq
+
+    archivo = manifiesto['particiones'][0]['archivo']
+    return pq.read_schema(os.path.join(directorio, archivo)).empty_table().to_pandas()
+
+
+# Carga sólo las particiones necesarias para el rango de años y recorta los bordes con un
+# filtro de filas al leer (con particiones por década la primera y la última pueden incluir
+# años de más). Si ninguna partición se solapa con el rango (por ejemplo, un hueco de años
+# con particiones por año) devuelve un DataFrame vacío con las columnas del dataset.
+def cargar_particiones(year_range, directorio=RUTA_PARTICIONES, manifiesto=None):
+    if manifiesto is None:
+        manifiesto = leer_manifiesto(directorio)
+    seleccion = particiones_en_rango(manifiesto, year_range)
+    if not seleccion:
+        return _particion_vacia(directorio, manifiesto)
+    desde, hasta = year_range
+    filtros = [('year_of_release', '>=', desde), ('year_of_release', '<=', hasta)]
+    partes = [pd.read_parquet(os.path.join(directorio, p['archivo']), filters=filtros) for p in seleccion]
+    return pd.concat(partes, ignore_index=True)
+
+
+# --- Bocetos para puntuaciones y ranking ---
+# Resúmenes de tamaño acotado que se pueden plegar bloque a bloque, para que la vista de
+# puntuaciones y el ranking funcionen sin guardar las filas (carga por bloques).
+
+# Bordes fijos del histograma de puntuaciones frente a ventas: así los histogramas de
+# distintos bloques tienen las mismas celdas y se pueden sumar. Las ventas van en escala
+# logarítmica (0 se lleva a la primera celda y lo que pase de 100 millones a la última).
+N_CELDAS_PUNTUACION = 40
+BORDES_PUNTUACION = {
+    'critic_score': np.linspace(0, 100, N_CELDAS_PUNTUACION + 1),
+    'user_score': np.linspace(0, 10, N_CELDAS_PUNTUACION + 1),
+}
+BORDES_VENTAS = np.geomspace(0.01, 100, N_CELDAS_PUNTUACION + 1)
+COLUMNAS_HISTOGRAMA = DIMENSIONES_CUBO + ['puntuacion', 'celda_x', 'celda_y']
+
+# Títulos que se guardan por región para el ranking en la carga por bloques
+TOP_RANKING = 1000
+COLUMNAS_RANKING = ['name'] + DIMENSIONES_CUBO + COLUMNAS_VENTAS
+
+
+# Celda de cada (puntuación, ventas) con los bordes fijos; el último borde se incluye en la
+# última celda, igual que en np.histogram2d
+def celdas_puntuacion_ventas(puntuaciones, ventas, columna_puntuacion):
+    bordes_x = BORDES_PUNTUACION[columna_puntuacion]
+    celda_x = np.clip(np.searchsorted(bordes_x, puntuaciones, side='right') - 1, 0, len(bordes_x) - 2)
+    celda_y = np.clip(np.searchsorted(BORDES_VENTAS, ventas, side='right') - 1, 0, len(BORDES_VENTAS) - 2)
+    return celda_x, celda_y
+
+
+# Histograma de puntuaciones frente a ventas en formato largo: número de juegos por
+# dimensiones del cubo, puntuación ('critic_score' o 'user_score') y celda. Conservar las
+# dimensiones permite aplicar los filtros de la barra lateral igual que al cubo.
+def calcular_histograma_puntuaciones(df):
+    partes = []
+    for columna in BORDES_PUNTUACION:
+        datos = df[DIMENSIONES_CUBO + [columna, 'total_sales']].dropna(subset=[columna, 'total_sales'])
+        celda_x, celda_y = celdas_puntuacion_ventas(
+            datos[columna].to_numpy(), datos['total_sales'].to_numpy(), columna)
+        parte = datos[DIMENSIONES_CUBO].assign(puntuacion=columna, celda_x=celda_x, celda_y=celda_y)
+        partes.append(parte.groupby(COLUMNAS_HISTOGRAMA, dropna=False).size().rename('n_juegos').reset_index())
+    return pd.concat(partes, ignore_index=True)
+
+
+# Combina varios histogramas parciales sumando los juegos de cada celda
+def combinar_histogramas(histogramas):
+    combinado = pd.concat(histogramas, ignore_index=True)
+    return combinado.groupby(COLUMNAS_HISTOGRAMA, dropna=False)['n_juegos'].sum().reset_index()
+
+
+# Los k títulos más vendidos de cada región. El índice identifica la fila en el CSV, así
+# un mismo título que está en el top de varias regiones se reconoce al unirlos.
+def calcular_top_ventas(df, k=TOP_RANKING):
+    return {columna: df.nlargest(k, columna, keep='first')[COLUMNAS_RANKING] for columna in COLUMNAS_VENTAS}
+
+
+# Combina el top acumulado con el de un bloque nuevo: por región nunca se guardan más de k
+# filas. El acumulado va primero, así los empates se resuelven por orden en el CSV.
+def combinar_top_ventas(top, parcial, k=TOP_RANKING):
+    return {
+        columna: pd.concat([top[columna], parcial[columna]]).nlargest(k, columna, keep='first')
+        for columna in COLUMNAS_VENTAS
+    }
+
+
+# Ranking a partir del top de cada región. Devuelve las filas (unión del top de todas las
+# regiones, sin repetidas y en el orden del CSV), el orden de cada región y su corte.
+# Cada región se ordena sólo con sus propias filas del top: una fila que está en la unión por
+# otra región no garantiza que estén todas las que la rodean en esta. Si el top de una región
+# está completo (k filas), por debajo de su k-ésima venta pueden faltar títulos, y también
+# empatados con ella, así que el orden se corta en las filas con ventas estrictamente mayores.
+# El corte es None cuando el top contiene todas las filas de la región.
+def ranking_top_ventas(top, k=TOP_RANKING):
+    union = pd.concat(top.values())
+    union = union[~union.index.duplicated()].sort_index()
+    posiciones = pd.Series(np.arange(len(union)), index=union.index)
+    ordenes, cortes = {}, {}
+    for columna, filas in top.items():
+        corte = float(filas[columna].min()) if len(filas) >= k else None
+        if corte is not None:
+            filas = filas[filas[columna] > corte]
+        # Posiciones en orden del CSV y orden estable de mayor a menor venta, como en la carga completa
+        propias = np.sort(posiciones[filas.index].to_numpy())
+        ventas = union[columna].to_numpy()[propias]
+        ordenes[columna] = propias[np.argsort(-ventas, kind='stable')]
+        cortes[columna] = corte
+    return {'filas': union.reset_index(drop=True), 'ordenes': ordenes, 'cortes': cortes}
+
+
+# --- Carga por bloques (fuera de memoria) ---
+# Lee el CSV en bloques, limpia cada bloque igual que la carga completa y lo pliega
+# directamente en el cubo de ventas, en el histograma de puntuaciones y en el top de
+# ventas por región. La memoria máxima depende del tamaño de bloque y del tamaño de esos
+# resúmenes, no del tamaño del CSV. Conservar las filas es opcional: sin ellas no están
+# disponibles las vistas que necesitan cada juego (distribuciones y comparador por título).
+
+TAMANO_BLOQUE = 100_000
+
+
+# Une los bloques de filas columna a columna. Cada bloque se guarda como un diccionario de
+# columnas independientes (ver cargar_por_bloques) y cada columna se quita de los bloques en
+# cuanto se une, así su memoria se libera enseguida: el pico es el de las filas más una
+# columna, en lugar del doble de las filas de pd.concat sobre la lista de bloques completa.
+# Vacía la lista de bloques.
+def _unir_bloques(bloques):
+    columnas = {}
+    for columna in list(bloques[0]):
+        columnas[columna] = pd.concat([bloque.pop(columna) for bloque in bloques], ignore_index=True)
+    bloques.clear()
+    return pd.DataFrame(columnas, copy=False)
+
+
+def cargar_por_bloques(ruta=RUTA_CSV, tamano_bloque=TAMANO_BLOQUE, conservar_filas=False, top_ranking=TOP_RANKING):
+    cubo = histograma = top = None
+    filas = [] if conservar_filas else None
+    n_filas = 0
+    for bloque in pd.read_csv(ruta, chunksize=tamano_bloque):
+        bloque = limpiar_datos(bloque)
+        n_filas += len(bloque)
+        parcial = calcular_cubo(bloque)
+        cubo = parcial if cubo is None else combinar_cubos([cubo, parcial])
+        parcial = calcular_histograma_puntuaciones(bloque)
+        histograma = parcial if histograma is None else combinar_histogramas([histograma, parcial])
+        parcial = calcular_top_ventas(bloque, top_ranking)
+        top = parcial if top is None else combinar_top_ventas(top, parcial, top_ranking)
+        if conservar_filas:
+            # Copia cada columna por separado: las columnas de un bloque leído comparten un
+            # array 2D por tipo y no se liberarían hasta quitarlas todas
+            filas.append({columna: bloque[columna].copy() for columna in bloque.columns})
+    return {
+        'cubo_ventas': cubo,
+        'histograma_puntuaciones': histograma,
+        'top_ventas': ranking_top_ventas(top, top_ranking),
+        'filas': _unir_bloques(filas) if conservar_filas else None,
+        'n_filas': n_filas,
+    }
@@ -0,0 +1,95 @@
+
+import numpy as np
+import pandas as pd
+
+# Este archivo contiene los índices de bitmaps para los filtros cruzados de la barra lateral.
+# Para cada valor de plataforma, género, clasificación ESRB y año se guarda un bitmap
+# empaquetado (un bit por fila, np.packbits), de modo que combinar filtros es un AND/OR
+# de arrays de bytes en lugar de comparar columnas de texto completas.
+
+COLUMNAS_INDICE = ['platform', 'genre', 'rating', 'year_of_release']
+# Etiqueta con la que se muestran los valores ausentes (por ejemplo, juegos sin clasificación ESRB)
+SIN_VALOR = "(sin valor)"
+
+
+# Construye un bitmap empaquetado por cada valor distinto de las columnas indicadas
+def construir_indice_bitmap(df, columnas=COLUMNAS_INDICE):
+    indice = {'n_filas': len(df), 'bitmaps': {}}
+    for columna in columnas:
+        # factorize asigna un código entero a cada valor (-1 para NaN) en una sola pasada
+        codigos, valores = pd.factorize(df[columna], sort=True)
+        bitmaps = {valor: np.packbits(codigos == codigo) for codigo, valor in enumerate(valores.tolist())}
+        if (codigos == -1).any():
+            bitmaps[SIN_VALOR] = np.packbits(codigos == -1)
+        indice['bitmaps'][columna] = bitmaps
+    return indice
+
+
+# Valores disponibles de una columna del índice, ordenados y con los ausentes al final
+def valores_indice(indice, columna):
+    valores = [v for v in indice['bitmaps'][columna] if v != SIN_VALOR]
+    if SIN_VALOR in indice['bitmaps'][columna]:
+        valores.append(SIN_VALOR)
+    return valores
+
+
+# Combina las selecciones: OR entre los valores de una misma columna y AND entre columnas.
+# Una selección vacía o None en una columna significa "sin filtro" para esa columna.
+# Devuelve una máscara booleana por fila, o None si no hay ningún filtro activo.
+def mascara_filtros(indice, selecciones):
+    n_bytes = (indice['n_filas'] + 7) // 8
+    resultado = None
+    for columna, valores in selecciones.items():
+        if not valores:
+            continue
+        bitmaps = indice['bitmaps'][columna]
+        union = np.zeros(n_bytes, dtype=np.uint8)
+        for valor in valores:
+            if valor in bitmaps:
+                union |= bitmaps[valor]
+        resultado = union if resultado is None else resultado & union
+    if resultado is None:
+        return None
+    return np.unpackbits(resultado, count=indice['n_filas']).astype(bool)
+
+
+# Filas de df que cumplen las selecciones, según su índice de bitmaps (df completo si no hay filtro)
+def filtrar_con_indice(df, indice, selecciones):
+    mascara = mascara_filtros(indice, selecciones)
+    return df if mascara is None else df[mascara]
+
+
+# --- Órdenes preordenados para el ranking de títulos ---
+# Para cada región se guarda una vez el orden de las filas de mayor a menor venta.
+# Una página del ranking se obtiene recorriendo ese orden y quedándose con las filas
+# que cumplen la máscara de filtros, sin volver a ordenar el dataset.
+
+# Orden descendente de filas por ventas para cada columna de región
+def construir_ordenes_ventas(df, columnas):
+    return {columna: np.argsort(-df[columna].to_numpy(), kind='stable') for columna in columnas}
+
+
+# Posiciones (en el DataFrame base) de la página pedida del ranking y número total de filas
+# del orden que cumplen los filtros. mascara es None cuando no hay ningún filtro activo.
+def pagina_ranking(orden, mascara, pagina, tamano_pagina):
+    inicio = pagina * tamano_pagina
+    fin = inicio + tamano_pagina
+    if mascara is None:
+        return orden[inicio:fin], len(orden)
+
+    # Se recorre el orden por bloques y se para en cuanto hay filas suficientes para la página
+    bloque = max(4 * fin, 1024)
+    encontradas = []
+    n_encontradas = 0
+    for desde in range(0, len(orden), bloque):
+        tramo = orden[desde:desde + bloque]
+        tramo = tramo[mascara[tramo]]
+        encontradas.append(tramo)
+        n_encontradas += len(tramo)
+        if n_encontradas >= fin:
+            break
+    posiciones = np.concatenate(encontradas) if encontradas else orden[:0]
+    # Si el orden no recorre todas las filas (ranking cortado), sólo cuentan las que incluye
+    if len(orden) != len(mascara):
+        mascara = mascara[orden]
+    return posiciones[inicio:fin], int(np.count_nonzero(mascara))
@@ -0,0 +1,94 @@
+
+import numpy as np
+import pandas as pd
+
+from datos import COLUMNAS_VENTAS
+
+# Este archivo contiene la capa de métricas de tendencia. Todas las métricas se calculan
+# a la vez para todas las entidades (plataformas o géneros) y todas las regiones, con
+# operaciones vectorizadas sobre una matriz ancha año × (región, entidad).
+
+# Fases del ciclo de vida, en el orden de sus códigos
+FASES = ['sin lanzar', 'lanzamiento', 'crecimiento', 'madurez', 'declive', 'retirada']
+# Cuota acumulada a partir de la cual una entidad sale de la fase de lanzamiento / entra en declive
+UMBRAL_LANZAMIENTO = 0.1
+UMBRAL_DECLIVE = 0.9
+
+
+# Matriz ancha de ventas: filas = años (todos los del rango, sin huecos), columnas = (región, entidad).
+# Funciona igual con filas de juegos que con el cubo de ventas, porque sólo suma ventas.
+def pivot_anio_entidad(df, entidad):
+    pivot = df.groupby(['year_of_release', entidad])[COLUMNAS_VENTAS].sum().unstack(entidad, fill_value=0)
+    anios = range(int(pivot.index.min()), int(pivot.index.max()) + 1)
+    return pivot.reindex(anios, fill_value=0).sort_index(axis=1)
+
+
+# Calcula todas las métricas sobre la matriz ancha. Devuelve un diccionario de DataFrames
+# con la misma forma que el pivot (salvo 'fase', que contiene las etiquetas de FASES).
+def calcular_metricas(pivot, ventana=3):
+    ventas = pivot.to_numpy(dtype=float)
+    anterior = pivot.shift(1)
+
+    media_movil = pivot.rolling(ventana, min_periods=1).mean()
+    # Crecimiento interanual en %; no se define cuando el año anterior no tuvo ventas
+    crecimiento_yoy = (pivot - anterior) / anterior.where(anterior > 0) * 100
+
+    acumulado = np.cumsum(ventas, axis=0)
+    total = acumulado[-1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cuota = np.where(total > 0, acumulado / total, 0.0)
+    cuota_acumulada = pd.DataFrame(cuota, index=pivot.index, columns=pivot.columns)
+
+    # Fases del ciclo de vida a partir de la cuota acumulada y de la posición respecto al año pico.
+    # El año pico es madurez; sólo hay declive después del pico, cuando la cuota acumulada
+    # ya supera el umbral (en el último año del rango la cuota siempre es 1, por eso no basta
+    # con la cuota: una entidad en su pico al final del rango sigue en madurez).
+    posicion = np.arange(len(pivot))[:, None]
+    pico = ventas.argmax(axis=0)[None, :]
+    ultimo_con_ventas = len(pivot) - 1 - (ventas[::-1] > 0).argmax(axis=0)[None, :]
+    codigos = np.select(
+        [
+            cuota == 0,
+            posicion > ultimo_con_ventas,
+            posicion == pico,
+            cuota < UMBRAL_LANZAMIENTO,
+            posicion < pico,
+            (posicion > pico) & (cuota >= UMBRAL_DECLIVE),
+        ],
+        [0, 5, 3, 1, 2, 4],
+        default=3,
+    )
+    fase = pd.DataFrame(np.array(FASES)[codigos], index=pivot.index, columns=pivot.columns)
+
+    return {
+        'ventas': pivot,
+        'media_movil': media_movil,
+        'crecimiento_yoy': crecimiento_yoy,
+        'cuota_acumulada': cuota_acumulada,
+        'fase': fase,
+    }
+
+
+# Pivot y métricas para una entidad ('platform' o 'genre') en todas las regiones
+def metricas_por_entidad(df, entidad, ventana=3):
+    return calcular_metricas(pivot_anio_entidad(df, entidad), ventana)
+
+
+# Las N entidades con más ventas en una región dentro del rango de las métricas
+def top_entidades(metricas, region, n=5):
+    return metricas['ventas'][region].sum().nlargest(n).loc[lambda s: s > 0].index.tolist()
+
+
+# Resumen del ciclo de vida por entidad en una región: primer y último año con ventas,
+# año pico y fase en el último año del rango
+def resumen_ciclo_vida(metricas, region):
+    ventas = metricas['ventas'][region]
+    con_ventas = ventas > 0
+    resumen = pd.DataFrame({
+        'primer_año': con_ventas.idxmax(),
+        'último_año': con_ventas[::-1].idxmax(),
+        'año_pico': ventas.idxmax(),
+        'ventas_pico': ventas.max(),
+        'fase_actual': metricas['fase'][region].iloc[-1],
+    })
+    return resumen[con_ventas.any()]
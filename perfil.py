@@ -0,0 +1,70 @@
+
+import io
+import os
+import time
+
+# Este archivo contiene el perfilado bajo demanda de una ejecución del dashboard.
+# Se activa con el parámetro de URL ?perfil=1 (perfila una sola ejecución) o, con la
+# variable de entorno PERFIL_DASHBOARD=1, con el botón "Perfilar esta vista" de la barra
+# lateral, que vuelve a ejecutar la vista actual (con su rango y filtros) perfilada.
+# Sólo se conservan los MAX_PERFILES más recientes.
+# Si no está activado no se importa cProfile ni se envuelve nada.
+
+DIRECTORIO_PERFILES = "perfiles"
+PARAMETRO_PERFIL = "perfil"
+VARIABLE_ENTORNO_PERFIL = "PERFIL_DASHBOARD"
+VALORES_ACTIVOS = ("1", "true", "si", "sí")
+MAX_PERFILES = 20
+
+
+# Indica si la variable de entorno habilita el botón de perfilado en la barra lateral
+def perfilado_disponible():
+    return os.environ.get(VARIABLE_ENTORNO_PERFIL, "").lower() in VALORES_ACTIVOS
+
+
+# Indica si se ha pedido perfilar esta ejecución: por el parámetro de URL o por el botón
+def perfilado_solicitado(query_params, boton_pulsado=False):
+    return boton_pulsado or query_params.get(PARAMETRO_PERFIL, "").lower() in VALORES_ACTIVOS
+
+
+# Borra los perfiles más antiguos del directorio y deja sólo los `maximo` más recientes
+def rotar_perfiles(directorio=DIRECTORIO_PERFILES, maximo=MAX_PERFILES):
+    rutas = [os.path.join(directorio, archivo) for archivo in os.listdir(directorio)
+             if archivo.startswith("perfil_") and archivo.endswith(".prof")]
+    rutas.sort(key=os.path.getmtime, reverse=True)
+    for ruta in rutas[maximo:]:
+        try:
+            os.remove(ruta)
+        except OSError:
+            # Otro proceso puede haberlo borrado ya
+            pass
+
+
+# Ejecuta la función bajo cProfile, guarda el perfil en un archivo con marca de tiempo
+# (con microsegundos y pid, para que dos ejecuciones seguidas no se pisen), rota los
+# perfiles antiguos y devuelve (resultado, ruta del perfil, texto con las funciones más costosas)
+def ejecutar_con_perfil(funcion, directorio=DIRECTORIO_PERFILES, n_funciones=25, max_perfiles=MAX_PERFILES):
+    import cProfile
+    import pstats
+
+    perfilador = cProfile.Profile()
+    perfilador.enable()
+    try:
+        resultado = funcion()
+    finally:
+        perfilador.disable()
+
+    os.makedirs(directorio, exist_ok=True)
+    ahora = time.time()
+    marca = time.strftime("%Y%m%d-%H%M%S", time.localtime(ahora)) + f"-{int(ahora % 1 * 1e6):06d}"
+    ruta = os.path.join(directorio, f"perfil_{marca}_{os.getpid()}.prof")
+    perfilador.dump_stats(ruta)
+    rotar_perfiles(directorio, max_perfiles)
+
+    # Primero por tiempo propio, que señala las funciones costosas en sí; el tiempo acumulado
+    # lo encabezan los envoltorios (despachar_vista y el propio Streamlit)
+    salida = io.StringIO()
+    for orden, titulo in (("tottime", "tiempo propio"), ("cumulative", "tiempo acumulado")):
+        salida.write(f"--- Funciones con más {titulo} ({orden}) ---\n")
+        pstats.Stats(perfilador, stream=salida).sort_stats(orden).print_stats(n_funciones)
+    return resultado, ruta, salida.getvalue()
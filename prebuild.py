@@ -0,0 +1,67 @@
+
+import argparse
+import time
+
+from datos import (
+    RUTA_CSV,
+    RUTA_PARTICIONES,
+    RUTA_SNAPSHOT,
+    calentar_matplotlib,
+    construir_snapshot,
+    escribir_particiones,
+    leer_snapshot,
+    snapshot_vigente,
+)
+
+# Paso de prebuild/release: genera el snapshot con los datos limpios y los agregados,
+# y calienta la caché de fuentes de Matplotlib, para que el primer usuario tras un
+# despliegue o reinicio no pague ese coste. Con --comprobaciones ejecuta además las
+# comprobaciones de comprobaciones.py (no forman parte del build por defecto).
+#
+# Uso:
+#   python prebuild.py              # regenera siempre el snapshot
+#   python prebuild.py --si-falta   # sólo lo regenera si falta o está desactualizado
+#   python prebuild.py --particiones decada   # además escribe el dataset particionado
+#   python prebuild.py --comprobaciones       # además ejecuta comprobaciones.py
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera el snapshot precalculado del dashboard.")
+    parser.add_argument("--csv", default=RUTA_CSV, help="CSV de origen")
+    parser.add_argument("--salida", default=RUTA_SNAPSHOT, help="Ruta del snapshot a generar")
+    parser.add_argument("--si-falta", action="store_true",
+                        help="No regenera el snapshot si ya existe y corresponde al CSV actual")
+    parser.add_argument("--particiones", choices=["anio", "decada"],
+                        help="Escribe también el dataset particionado en Parquet con esta granularidad")
+    parser.add_argument("--dir-particiones", default=RUTA_PARTICIONES,
+                        help="Directorio del dataset particionado")
+    parser.add_argument("--comprobaciones", action="store_true",
+                        help="Ejecuta también las comprobaciones de comprobaciones.py")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    calentar_matplotlib()
+    print(f"Caché de Matplotlib calentada en {time.perf_counter() - inicio:.2f} s")
+
+    snapshot = leer_snapshot(args.salida)
+    if args.si_falta and snapshot_vigente(snapshot, args.csv):
+        print(f"Snapshot vigente en {args.salida}, no se regenera")
+    else:
+        inicio = time.perf_counter()
+        snapshot = construir_snapshot(args.csv, args.salida)
+        print(f"Snapshot escrito en {args.salida} ({len(snapshot['datos'])} filas) "
+              f"en {time.perf_counter() - inicio:.2f} s")
+
+    if args.particiones:
+        inicio = time.perf_counter()
+        manifiesto = escribir_particiones(snapshot['datos'], args.dir_particiones, args.particiones, args.csv)
+        print(f"{len(manifiesto['particiones'])} particiones escritas en {args.dir_particiones} "
+              f"en {time.perf_counter() - inicio:.2f} s")
+
+    if args.comprobaciones:
+        from comprobaciones import ejecutar_comprobaciones
+        ejecutar_comprobaciones()
+
+
+if __name__ == "__main__":
+    main()